@@ -6,6 +6,7 @@ from typing import Optional
 
 import sqlalchemy as sa
 from flask_login import UserMixin
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from werkzeug.security import check_password_hash, generate_password_hash
 
@@ -140,13 +141,27 @@ class AdminUser(UserMixin, db.Model):
 class AdminAuditLog(db.Model):
     __tablename__ = "admin_audit_logs"
 
-    id: int = db.Column(db.Integer, primary_key=True)
+    __table_args__ = (
+        db.Index(
+            "ix_admin_audit_logs_user_time",
+            "admin_user_id",
+            sa.text("created_at DESC"),
+            postgresql_include=["action"],
+        ),
+        db.Index(
+            "ix_admin_audit_logs_created_at",
+            "created_at",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ),
+    )
+
+    id: int = db.Column(db.BigInteger, primary_key=True)
 
     admin_user_id: int = db.Column(
         db.Integer,
         db.ForeignKey("admin_users.id"),
         nullable=False,
-        index=True,
     )
 
     action: str = db.Column(db.String(60), nullable=False, index=True)
@@ -159,7 +174,6 @@ class AdminAuditLog(db.Model):
         nullable=False,
         default=utcnow,
         server_default=func.now(),
-        index=True,
     )
 
     admin_user = db.relationship("AdminUser", lazy="joined")
@@ -310,6 +324,38 @@ class Customer(db.Model):
 class Subscription(db.Model):
     __tablename__ = "subscriptions"
 
+    # service_type is low-cardinality; index only the active rows per service.
+    # created_at is append-only, so it gets a BRIN index rather than a b-tree.
+    __table_args__ = (
+        db.Index(
+            "ix_subscriptions_created_at_brin",
+            "created_at",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ),
+        db.Index(
+            "ix_subs_pppoe_active",
+            "customer_id",
+            postgresql_where=sa.text("service_type = 'pppoe' AND status = 'active'"),
+        ),
+        db.Index(
+            "ix_subs_hotspot_active",
+            "customer_id",
+            postgresql_where=sa.text("service_type = 'hotspot' AND status = 'active'"),
+        ),
+        db.Index(
+            "ix_subscriptions_status_expires",
+            "status",
+            "expires_at",
+            postgresql_where=sa.text("status = 'active'"),
+        ),
+        db.Index(
+            "ix_subscriptions_pending_package_id",
+            "pending_package_id",
+            postgresql_where=sa.text("pending_package_id IS NOT NULL"),
+        ),
+    )
+
     id: int = db.Column(db.Integer, primary_key=True)
 
     customer_id: int = db.Column(db.Integer, db.ForeignKey("customers.id"), nullable=False, index=True)
@@ -319,9 +365,8 @@ class Subscription(db.Model):
     # If customer requests a downgrade mid-cycle, apply it at next renewal (no refunds)
     pending_package_id: Optional[int] = db.Column(
         db.Integer,
-        db.ForeignKey("packages.id"),
+        db.ForeignKey("packages.id", ondelete="SET NULL"),
         nullable=True,
-        index=True,
     )
 
     service_type: str = db.Column(
@@ -329,7 +374,6 @@ class Subscription(db.Model):
         nullable=False,
         default="hotspot",
         server_default=sa.text("'hotspot'"),
-        index=True,
     )
 
     pppoe_username: Optional[str] = db.Column(db.String(64), nullable=True, index=True)
@@ -340,14 +384,13 @@ class Subscription(db.Model):
         nullable=False,
         default="pending",
         server_default=sa.text("'pending'"),
-        index=True,
     )
 
     starts_at: Optional[datetime] = db.Column(db.DateTime, nullable=True, index=True)
-    expires_at: Optional[datetime] = db.Column(db.DateTime, nullable=True, index=True)
+    expires_at: Optional[datetime] = db.Column(db.DateTime, nullable=True)
 
     router_username: Optional[str] = db.Column(db.String(50), nullable=True, index=True)
-    mac_address: Optional[str] = db.Column(db.String(30), nullable=True, index=True)
+    mac_address: Optional[str] = db.Column(db.String(30), nullable=True)
 
     last_tx_id: Optional[int] = db.Column(
         db.Integer,
@@ -361,7 +404,6 @@ class Subscription(db.Model):
         nullable=False,
         default=utcnow,
         server_default=func.now(),
-        index=True,
     )
 
     # Relationships
@@ -574,6 +616,14 @@ class AssetEvent(db.Model):
 class ExpenseCategory(db.Model):
     __tablename__ = "expense_categories"
 
+    __table_args__ = (
+        db.Index(
+            "ix_expense_categories_root_name",
+            "name",
+            postgresql_where=sa.text("parent_id IS NULL"),
+        ),
+    )
+
     id: int = db.Column(db.Integer, primary_key=True)
 
     name: str = db.Column(db.String(60), nullable=False, index=True)
@@ -749,7 +799,6 @@ class CustomerLocation(db.Model):
         nullable=False,
         default=False,
         server_default=sa.text("false"),
-        index=True,
     )
 
     active_from_utc: datetime = db.Column(db.DateTime, nullable=False, index=True)
@@ -795,6 +844,24 @@ class CustomerLocation(db.Model):
 class Ticket(db.Model):
     __tablename__ = "tickets"
 
+    __table_args__ = (
+        db.Index(
+            "ix_tickets_customer_status_opened",
+            "customer_id",
+            "status",
+            sa.text("opened_at_utc DESC"),
+        ),
+        db.Index(
+            "ix_tickets_assignee_status_priority",
+            "assigned_to_admin_id",
+            "status",
+            "priority",
+            postgresql_where=sa.text(
+                "status IN ('open', 'assigned', 'in_progress', 'waiting_customer')"
+            ),
+        ),
+    )
+
     id: int = db.Column(db.Integer, primary_key=True)
 
     code: str = db.Column(db.String(30), nullable=False, unique=True, index=True)
@@ -803,7 +870,6 @@ class Ticket(db.Model):
         db.Integer,
         db.ForeignKey("customers.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
 
     subscription_id: Optional[int] = db.Column(
@@ -841,7 +907,6 @@ class Ticket(db.Model):
         nullable=False,
         default="open",
         server_default=sa.text("'open'"),
-        index=True,
     )
 
     subject: str = db.Column(db.String(160), nullable=False)
@@ -929,13 +994,27 @@ class Ticket(db.Model):
 class TicketUpdate(db.Model):
     __tablename__ = "ticket_updates"
 
+    __table_args__ = (
+        db.Index(
+            "ix_ticket_updates_ticket_time",
+            "ticket_id",
+            sa.text("created_at DESC"),
+            postgresql_include=["status_to", "actor_admin_id"],
+        ),
+        db.Index(
+            "ix_ticket_updates_created_at",
+            "created_at",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ),
+    )
+
     id: int = db.Column(db.Integer, primary_key=True)
 
     ticket_id: int = db.Column(
         db.Integer,
         db.ForeignKey("tickets.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
 
     actor_admin_id: Optional[int] = db.Column(
@@ -969,7 +1048,6 @@ class TicketUpdate(db.Model):
         nullable=False,
         default=utcnow,
         server_default=UTCNOW_SQL,
-        index=True,
     )
 
     ticket = db.relationship("Ticket", back_populates="updates", lazy="joined")
@@ -999,7 +1077,21 @@ class TicketUpdate(db.Model):
 class MpesaPayment(db.Model):
     __tablename__ = "mpesa_payments"
 
-    id = db.Column(db.Integer, primary_key=True)
+    __table_args__ = (
+        db.Index(
+            "ix_mpesa_payments_pending",
+            "created_at",
+            postgresql_where=sa.text("status = 'pending'"),
+        ),
+        db.Index(
+            "ix_mpesa_payments_created_at",
+            "created_at",
+            postgresql_using="brin",
+            postgresql_with={"pages_per_range": 32},
+        ),
+    )
+
+    id = db.Column(db.BigInteger, primary_key=True)
     customer_id = db.Column(db.Integer, nullable=True)
     subscription_id = db.Column(db.Integer, nullable=True)
 
@@ -1016,7 +1108,7 @@ class MpesaPayment(db.Model):
     result_code = db.Column(db.Integer, nullable=True)
     result_desc = db.Column(db.Text, nullable=True)
 
-    raw_callback = db.Column(db.JSON, nullable=True)
+    raw_callback = db.Column(JSONB, nullable=True)
 
     external_updated_at = db.Column(db.DateTime(timezone=True), nullable=True)
 
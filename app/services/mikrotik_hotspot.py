@@ -221,6 +221,38 @@ def ensure_hotspot_user(
             pass
 
 
+def _disable_user_on(api, username: str, reason: str) -> HotspotResult:
+    users = api.get_resource("/ip/hotspot/user")
+
+    row = _normalize_row(users.get(name=username))
+    if not row or not row.get(".id"):
+        return HotspotResult(ok=True, message="User not found (nothing to disable)", meta={"username": username})
+
+    new_comment = _build_comment(row.get("comment", ""), f"disabled={reason}")
+    users.set(id=row[".id"], disabled="yes", comment=new_comment)
+    return HotspotResult(ok=True, message="Hotspot user disabled", meta={"username": username})
+
+
+def _kick_active_on(api, username: str) -> HotspotResult:
+    removed = 0
+    try:
+        active = api.get_resource("/ip/hotspot/active")
+        rows = active.get(user=username)
+        if isinstance(rows, dict):
+            rows = [rows]
+        rows = rows or []
+
+        for r in rows:
+            rid = r.get(".id")
+            if rid:
+                active.remove(id=rid)
+                removed += 1
+
+        return HotspotResult(ok=True, message="Hotspot active sessions removed", meta={"username": username, "removed": removed})
+    except Exception as e:
+        return HotspotResult(ok=False, message=f"kick_hotspot_active failed: {e}", meta={"username": username, "removed": removed})
+
+
 def disable_hotspot_user(app, username: str, *, reason: str = "expired") -> HotspotResult:
     """
     Disable /ip/hotspot/user for the given username.
@@ -240,17 +272,7 @@ def disable_hotspot_user(app, username: str, *, reason: str = "expired") -> Hots
 
     pool = _conn(app)
     try:
-        api = pool.get_api()
-        users = api.get_resource("/ip/hotspot/user")
-
-        row = _normalize_row(users.get(name=username))
-        if not row or not row.get(".id"):
-            return HotspotResult(ok=True, message="User not found (nothing to disable)", meta={"username": username})
-
-        new_comment = _build_comment(row.get("comment", ""), f"disabled={reason}")
-        users.set(id=row[".id"], disabled="yes", comment=new_comment)
-        return HotspotResult(ok=True, message="Hotspot user disabled", meta={"username": username})
-
+        return _disable_user_on(pool.get_api(), username, reason)
     except Exception as e:
         return HotspotResult(ok=False, message=f"disable_hotspot_user failed: {e}", meta={"username": username})
     finally:
@@ -281,26 +303,64 @@ def kick_hotspot_active(app, username: str) -> HotspotResult:
         )
 
     pool = _conn(app)
-    removed = 0
     try:
-        api = pool.get_api()
-        active = api.get_resource("/ip/hotspot/active")
+        return _kick_active_on(pool.get_api(), username)
+    except Exception as e:
+        return HotspotResult(ok=False, message=f"kick_hotspot_active failed: {e}", meta={"username": username, "removed": 0})
+    finally:
+        try:
+            pool.disconnect()
+        except Exception:
+            pass
 
-        rows = active.get(user=username)
-        if isinstance(rows, dict):
-            rows = [rows]
-        rows = rows or []
 
-        for r in rows:
-            rid = r.get(".id")
-            if rid:
-                active.remove(id=rid)
-                removed += 1
+def disable_and_kick_hotspot_user(
+    app,
+    username: str,
+    *,
+    reason: str = "expired",
+) -> tuple[HotspotResult, HotspotResult]:
+    """
+    disable_hotspot_user + kick_hotspot_active over a single API connection.
 
-        return HotspotResult(ok=True, message="Hotspot active sessions removed", meta={"username": username, "removed": removed})
+    The kick must follow the disable (otherwise cookie/MAC login re-auths the
+    device straight away), so the two steps stay sequential; sharing the
+    connection saves the second connect + login round trip.
+    """
+    username = (username or "").strip()
+    if not username:
+        missing = HotspotResult(ok=False, message="Missing username")
+        return missing, missing
+
+    if _router_disabled(app):
+        return (
+            HotspotResult(
+                ok=True,
+                skipped=True,
+                message="Router automation disabled (ROUTER_AGENT_ENABLED=false); skipped disable_hotspot_user",
+                meta={"username": username, "reason": reason},
+            ),
+            HotspotResult(
+                ok=True,
+                skipped=True,
+                message="Router automation disabled (ROUTER_AGENT_ENABLED=false); skipped kick_hotspot_active",
+                meta={"username": username, "removed": 0},
+            ),
+        )
 
+    pool = _conn(app)
+    try:
+        api = pool.get_api()
+        try:
+            disabled = _disable_user_on(api, username, reason)
+        except Exception as e:
+            disabled = HotspotResult(ok=False, message=f"disable_hotspot_user failed: {e}", meta={"username": username})
+        return disabled, _kick_active_on(api, username)
     except Exception as e:
-        return HotspotResult(ok=False, message=f"kick_hotspot_active failed: {e}", meta={"username": username, "removed": removed})
+        return (
+            HotspotResult(ok=False, message=f"disable_hotspot_user failed: {e}", meta={"username": username}),
+            HotspotResult(ok=False, message=f"kick_hotspot_active failed: {e}", meta={"username": username, "removed": 0}),
+        )
     finally:
         try:
             pool.disconnect()
@@ -1,28 +1,194 @@
 from __future__ import annotations
+import atexit
+import logging
 import os
+import random
+import smtplib
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.header import Header
+from email.message import EmailMessage
+from functools import lru_cache
+from string import Template
 import requests
 from flask import current_app
 
+try:  # optional: faster JSON encoder that returns bytes directly
+    import orjson
+
+    def _json_bytes(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    import json
+
+    def _json_bytes(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+log = logging.getLogger("notifications.notify")
+
+# Notifications run off the request thread so the lead response doesn't wait
+# on WhatsApp/SMTP round trips.
+_NOTIFY_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="notify")
+atexit.register(_NOTIFY_POOL.shutdown, wait=True)
+
+# Shared session keeps the Graph API connection alive between notifications.
+_WA_SESSION = requests.Session()
+_WA_MAX_ATTEMPTS = 4  # first try + 3 retries, backing off 1s, 4s, 16s (+ jitter)
+_WA_RETRY_STATUSES = {429, 500, 502, 503, 504}
+_WA_STATIC = {"messaging_product": "whatsapp", "type": "text"}
+
+# Parsing the system CA bundle is not free; do it once per process.
+_SSL_CTX = ssl.create_default_context()
+
+# RFC 5322 hard limit on line length (octets, excluding CRLF).
+_SMTP_MAX_LINE = 998
+
 def _env(name: str, default: str = "") -> str:
     return (os.getenv(name) or default).strip()
 
+def _env_bool(name: str, default: str = "false") -> bool:
+    return _env(name, default).lower() in {"1","true","yes","y","on"}
+
+
+@dataclass(frozen=True)
+class _WhatsAppConfig:
+    enabled: bool
+    token: str
+    phone_id: str
+    to: str
+
+
+@dataclass(frozen=True)
+class _EmailConfig:
+    enabled: bool
+    host: str
+    port: int
+    user: str
+    password: str
+    to_list: tuple[str, ...]
+    mail_from: str
+    implicit_tls: bool
+    use_mime: bool
+    template: Template
+
+
+# Env is fixed for the life of the process; read it once instead of per lead.
+@lru_cache(maxsize=1)
+def _wa_cfg() -> _WhatsAppConfig:
+    return _WhatsAppConfig(
+        enabled=_env_bool("WHATSAPP_ENABLED"),
+        token=_env("WHATSAPP_TOKEN"),
+        phone_id=_env("WHATSAPP_PHONE_NUMBER_ID"),
+        to=_env("WHATSAPP_TO"),
+    )
+
+
+def _email_template(mail_from: str, to_list: tuple[str, ...]) -> Template:
+    """
+    Pre-rendered RFC 5322 plain-text message; only $subject and $body vary
+    per lead. Declared 7bit, so it is only valid for ASCII bodies with lines
+    of at most _SMTP_MAX_LINE octets (see _fits_template). smtplib.sendmail
+    only fixes line endings for str messages, so the caller must pass $body
+    with CRLF already in place; dot-stuffing is still done by smtplib.
+    """
+    def esc(value: str) -> str:
+        return value.replace("$", "$$")
+
+    return Template(
+        f"From: {esc(mail_from)}\r\n"
+        f"To: {esc(', '.join(to_list))}\r\n"
+        "Subject: $subject\r\n"
+        "MIME-Version: 1.0\r\n"
+        "Content-Type: text/plain; charset=us-ascii\r\n"
+        "Content-Transfer-Encoding: 7bit\r\n"
+        "\r\n"
+        "$body"
+    )
+
+
+def _fits_template(body: str) -> bool:
+    """True if `body` can go out as-is under the template's 7bit encoding."""
+    return body.isascii() and all(len(line) <= _SMTP_MAX_LINE for line in body.splitlines())
+
+
+@lru_cache(maxsize=1)
+def _email_cfg() -> _EmailConfig:
+    user = _env("SMTP_USER")
+    port = int(_env("SMTP_PORT", "587"))
+    to_list = tuple(x.strip() for x in _env("EMAIL_TO").split(",") if x.strip())
+    mail_from = _env("EMAIL_FROM", user)
+    return _EmailConfig(
+        enabled=_env_bool("EMAIL_ENABLED"),
+        host=_env("SMTP_HOST"),
+        port=port,
+        user=user,
+        password=_env("SMTP_PASS"),
+        to_list=to_list,
+        mail_from=mail_from,
+        implicit_tls=port == 465 or _env_bool("SMTP_SSL"),
+        use_mime=_env_bool("EMAIL_USE_MIME"),
+        template=_email_template(mail_from, to_list),
+    )
+
+@dataclass(frozen=True, slots=True)
+class LeadNotify:
+    """Lead payload normalized once for all notification channels."""
+    kind: str
+    name: str
+    phone: str
+    estate: str
+    message: str
+    source: str
+    id: str
+    created_at: str
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> LeadNotify:
+        def field(key: str, default: str = "") -> str:
+            value = payload.get(key)
+            return default if value is None else str(value)
+
+        return cls(
+            kind=field("kind", "lead"),
+            name=field("name"),
+            phone=field("phone"),
+            estate=field("estate"),
+            message=field("message"),
+            source=field("source"),
+            id=field("id"),
+            created_at=field("created_at"),
+        )
+
+def _run_notify(app, fn, lead: LeadNotify, label: str) -> None:
+    try:
+        fn(lead)
+    except Exception:
+        app.logger.exception("%s notify failed", label)
+
 def notify_admin_new_lead(payload: dict) -> None:
     """
     Best-effort notifications. Never throws to caller.
     payload keys: kind, name, phone, estate, message, id, created_at
+
+    WhatsApp and email are sent in the background; this returns immediately.
     """
+    app = current_app._get_current_object()
     try:
-        _notify_whatsapp(payload)
+        lead = LeadNotify.from_payload(payload)
     except Exception:
-        current_app.logger.exception("WhatsApp notify failed")
+        app.logger.exception("Lead notify payload invalid")
+        return
 
-    try:
-        _notify_email(payload)
-    except Exception:
-        current_app.logger.exception("Email notify failed")
+    for fn, label in ((_notify_whatsapp, "WhatsApp"), (_notify_email, "Email")):
+        try:
+            _NOTIFY_POOL.submit(_run_notify, app, fn, lead, label)
+        except Exception:
+            app.logger.exception("%s notify could not be scheduled", label)
 
 
-def _notify_whatsapp(payload: dict) -> None:
+def _notify_whatsapp(lead: LeadNotify) -> None:
     """
     WhatsApp Cloud API (Meta).
     Env:
@@ -31,83 +197,124 @@ def _notify_whatsapp(payload: dict) -> None:
       WHATSAPP_PHONE_NUMBER_ID=...
       WHATSAPP_TO=2547xxxxxxx (admin number)
     """
-    enabled = _env("WHATSAPP_ENABLED", "false").lower() in {"1","true","yes","y","on"}
-    if not enabled:
-        return
-
-    token = _env("WHATSAPP_TOKEN")
-    phone_number_id = _env("WHATSAPP_PHONE_NUMBER_ID")
-    to = _env("WHATSAPP_TO")
-    if not token or not phone_number_id or not to:
+    cfg = _wa_cfg()
+    if not (cfg.enabled and cfg.token and cfg.phone_id and cfg.to):
         return
 
     msg = (
-        f"New {payload.get('kind','lead')} lead\n"
-        f"Name: {payload.get('name','')}\n"
-        f"Phone: {payload.get('phone','')}\n"
-        f"Estate: {payload.get('estate','')}\n"
-        f"Message: {payload.get('message','')}\n"
-        f"ID: {payload.get('id','')}"
+        f"New {lead.kind} lead\n"
+        f"Name: {lead.name}\n"
+        f"Phone: {lead.phone}\n"
+        f"Estate: {lead.estate}\n"
+        f"Message: {lead.message}\n"
+        f"ID: {lead.id}"
     )
 
-    url = f"https://graph.facebook.com/v20.0/{phone_number_id}/messages"
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    data = {
-        "messaging_product": "whatsapp",
-        "to": to,
-        "type": "text",
-        "text": {"body": msg},
-    }
-    requests.post(url, headers=headers, json=data, timeout=10).raise_for_status()
+    url = f"https://graph.facebook.com/v20.0/{cfg.phone_id}/messages"
+    headers = {"Authorization": f"Bearer {cfg.token}", "Content-Type": "application/json"}
+    body = _json_bytes({**_WA_STATIC, "to": cfg.to, "text": {"body": msg}})
+    _wa_post(url, headers, body)
+
+
+def _retry_after_seconds(resp: requests.Response) -> float:
+    try:
+        return float(resp.headers.get("Retry-After") or 0)
+    except ValueError:
+        return 0.0
 
 
-def _notify_email(payload: dict) -> None:
+def _wa_post(url: str, headers: dict, body: bytes) -> None:
+    """
+    POST to the Graph API, retrying rate limits (429), 5xx and network errors
+    with exponential backoff. Other 4xx responses raise immediately.
+    """
+    last_status = None
+    last_error = ""
+
+    for attempt in range(1, _WA_MAX_ATTEMPTS + 1):
+        delay = 4 ** (attempt - 1) + random.random()
+        try:
+            resp = _WA_SESSION.post(url, headers=headers, data=body, timeout=10)
+        except requests.RequestException as exc:
+            last_status, last_error = None, str(exc)
+        else:
+            if resp.status_code not in _WA_RETRY_STATUSES:
+                resp.raise_for_status()
+                return
+            last_status, last_error = resp.status_code, (resp.text or "")[:200]
+            delay = max(delay, _retry_after_seconds(resp))
+
+        if attempt < _WA_MAX_ATTEMPTS:
+            time.sleep(min(64.0, delay))
+
+    log.error(
+        "WhatsApp notify gave up attempts=%s last_status=%s error=%s",
+        _WA_MAX_ATTEMPTS,
+        last_status,
+        last_error,
+    )
+
+
+def _notify_email(lead: LeadNotify) -> None:
     """
     Simple SMTP email.
     Env:
       EMAIL_ENABLED=true
       SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASS
+      SMTP_SSL=true (implicit TLS; automatic when SMTP_PORT=465)
+      EMAIL_USE_MIME=true (always build via EmailMessage instead of the cached
+        template; non-ASCII or long-line bodies use EmailMessage regardless)
       EMAIL_TO (comma separated)
       EMAIL_FROM
     """
-    enabled = _env("EMAIL_ENABLED", "false").lower() in {"1","true","yes","y","on"}
-    if not enabled:
+    cfg = _email_cfg()
+    if not (cfg.enabled and cfg.host and cfg.to_list and cfg.mail_from):
         return
 
-    import smtplib
-    from email.message import EmailMessage
-
-    host = _env("SMTP_HOST")
-    port = int(_env("SMTP_PORT", "587"))
-    user = _env("SMTP_USER")
-    pw = _env("SMTP_PASS")
-    to_list = [x.strip() for x in _env("EMAIL_TO").split(",") if x.strip()]
-    mail_from = _env("EMAIL_FROM", user)
-
-    if not host or not to_list or not mail_from:
-        return
-
-    subject = f"[Dmpolin] New {payload.get('kind','lead').title()} Lead #{payload.get('id','')}"
+    subject = f"[Dmpolin] New {lead.kind.title()} Lead #{lead.id}"
     body = (
         f"New lead received:\n\n"
-        f"Kind: {payload.get('kind','')}\n"
-        f"Name: {payload.get('name','')}\n"
-        f"Phone: {payload.get('phone','')}\n"
-        f"Estate: {payload.get('estate','')}\n"
-        f"Message: {payload.get('message','')}\n"
-        f"Source: {payload.get('source','')}\n"
-        f"Created: {payload.get('created_at','')}\n"
-        f"ID: {payload.get('id','')}\n"
+        f"Kind: {lead.kind}\n"
+        f"Name: {lead.name}\n"
+        f"Phone: {lead.phone}\n"
+        f"Estate: {lead.estate}\n"
+        f"Message: {lead.message}\n"
+        f"Source: {lead.source}\n"
+        f"Created: {lead.created_at}\n"
+        f"ID: {lead.id}\n"
     )
 
-    msg = EmailMessage()
-    msg["Subject"] = subject
-    msg["From"] = mail_from
-    msg["To"] = ", ".join(to_list)
-    msg.set_content(body)
-
-    with smtplib.SMTP(host, port, timeout=10) as s:
-        s.starttls()
-        if user and pw:
-            s.login(user, pw)
-        s.send_message(msg)
+    msg = None
+    raw = b""
+    if cfg.use_mime or not _fits_template(body):
+        # quoted-printable keeps the wire 7-bit clean and folds long lines,
+        # so it needs neither 8BITMIME nor short lead messages.
+        msg = EmailMessage()
+        msg["Subject"] = subject
+        msg["From"] = cfg.mail_from
+        msg["To"] = ", ".join(cfg.to_list)
+        msg.set_content(body, cte="quoted-printable")
+    else:
+        if not subject.isascii():
+            subject = Header(subject, "utf-8").encode(linesep="\r\n")
+        # Bytes go out as-is, so bare LFs (including any in lead.message)
+        # must become CRLF here or strict MTAs will reject the message.
+        body = body.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "\r\n")
+        raw = cfg.template.substitute(subject=subject, body=body).encode("utf-8")
+
+    if cfg.implicit_tls:
+        # TLS from the first byte: saves the STARTTLS round trip.
+        smtp = smtplib.SMTP_SSL(cfg.host, cfg.port, timeout=10, context=_SSL_CTX)
+    else:
+        smtp = smtplib.SMTP(cfg.host, cfg.port, timeout=10)
+
+    with smtp as s:
+        if not cfg.implicit_tls:
+            s.starttls(context=_SSL_CTX)
+        if cfg.user and cfg.password:
+            s.login(cfg.user, cfg.password)
+        if msg is not None:
+            s.send_message(msg)
+        else:
+            s.sendmail(cfg.mail_from, list(cfg.to_list), raw)
+
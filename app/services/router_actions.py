@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-from typing import Any, Dict
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
 
 from flask import current_app
+from sqlalchemy import text
 
+from app.extensions import db
 from app.services.mikrotik_hotspot import (
-    disable_hotspot_user,
+    disable_and_kick_hotspot_user,
     ensure_hotspot_user,
     kick_hotspot_active,
 )
@@ -21,7 +25,8 @@ def _log(message: str) -> None:
     try:
         current_app.logger.info(message)
     except Exception:
-        print(f"[router_actions] {datetime.now(timezone.utc).isoformat()} {message}")
+        ts = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        sys.stderr.write(f"[router_actions] {ts} {message}\n")
 
 
 def _subscription_meta(subscription) -> tuple[str, Any, Any]:
@@ -31,6 +36,34 @@ def _subscription_meta(subscription) -> tuple[str, Any, Any]:
     return svc, sub_id, customer_id
 
 
+# First key of the two-key pg advisory lock, so subscription ids here don't
+# collide with advisory locks taken elsewhere.
+_ROUTER_LOCK_NS = 7301
+
+
+@contextmanager
+def _subscription_router_lock(sub_id) -> Iterator[bool]:
+    """
+    Non-blocking per-subscription lock around router calls.
+
+    Yields False if another worker (e.g. payment webhook vs. expiry cron) is
+    already acting on this subscription. Transaction-level lock on its own
+    pooled connection: it is released when that short transaction ends, on
+    success or error, so nothing depends on an unlock statement running on
+    the right connection, and the caller's session transaction is untouched.
+    """
+    if sub_id is None:
+        yield True
+        return
+
+    params = {"ns": _ROUTER_LOCK_NS, "k": int(sub_id)}
+    with db.engine.connect() as conn, conn.begin():
+        got = bool(
+            conn.execute(text("SELECT pg_try_advisory_xact_lock(:ns, :k)"), params).scalar()
+        )
+        yield got
+
+
 def _pppoe_username(subscription) -> str:
     return (getattr(subscription, "pppoe_username", "") or "").strip()
 
@@ -39,6 +72,165 @@ def _hotspot_username(subscription) -> str:
     return (getattr(subscription, "hotspot_username", "") or "").strip()
 
 
+def _agent_disabled_result() -> Dict[str, Any]:
+    return {
+        "ok": False,
+        "skipped": True,
+        "message": "Router agent disabled (ROUTER_AGENT_ENABLED=false)",
+    }
+
+
+def _concurrent_op_result() -> Dict[str, Any]:
+    return {
+        "ok": False,
+        "skipped": True,
+        "message": "Concurrent router op in progress",
+    }
+
+
+# ---------------------------------------------------------------------
+# Per-service handlers: (app, subscription, reason) -> result dict
+# ---------------------------------------------------------------------
+def _disconnect_pppoe(app, subscription, reason: str) -> Dict[str, Any]:
+    _, sub_id, customer_id = _subscription_meta(subscription)
+    username = _pppoe_username(subscription)
+    if not username:
+        return {"ok": False, "message": "Missing pppoe_username"}
+
+    try:
+        relay_result = disable_pppoe(username, disconnect=True)
+        result = {
+            "ok": True,
+            "message": "PPPoE disabled via relay",
+            "meta": {"relay": relay_result},
+        }
+        _log(
+            f"DISCONNECT OK sub_id={sub_id} customer_id={customer_id} "
+            f"svc=pppoe username={username} result={result}"
+        )
+        return result
+    except RelayError as exc:
+        app.logger.exception(
+            "PPPoE relay disable failed sub_id=%s username=%s",
+            sub_id,
+            username,
+        )
+        return {"ok": False, "message": f"PPPoE relay disable failed: {exc}"}
+
+
+def _disconnect_hotspot(app, subscription, reason: str) -> Dict[str, Any]:
+    if not app.config.get("ROUTER_AGENT_ENABLED", False):
+        return _agent_disabled_result()
+
+    _, sub_id, customer_id = _subscription_meta(subscription)
+    username = _hotspot_username(subscription)
+    if not username:
+        return {"ok": False, "message": "Missing hotspot_username"}
+
+    try:
+        _, removed = disable_and_kick_hotspot_user(app, username)
+        result = {
+            "ok": True,
+            "message": "Hotspot disabled + kicked",
+            "meta": {"removed": removed},
+        }
+        _log(
+            f"DISCONNECT OK sub_id={sub_id} customer_id={customer_id} "
+            f"svc=hotspot username={username} result={result}"
+        )
+        return result
+    except Exception as exc:
+        app.logger.exception(
+            "Hotspot disconnect failed sub_id=%s username=%s",
+            sub_id,
+            username,
+        )
+        return {"ok": False, "message": f"Hotspot disconnect failed: {exc}"}
+
+
+def _reconnect_pppoe(app, subscription, reason: str) -> Dict[str, Any]:
+    _, sub_id, customer_id = _subscription_meta(subscription)
+    username = _pppoe_username(subscription)
+    if not username:
+        return {"ok": False, "message": "Missing pppoe_username"}
+
+    try:
+        relay_result = enable_pppoe(username, disconnect=True)
+        result = {
+            "ok": True,
+            "message": "PPPoE enabled via relay",
+            "meta": {"relay": relay_result},
+        }
+        _log(
+            f"RECONNECT OK sub_id={sub_id} customer_id={customer_id} "
+            f"svc=pppoe username={username} result={result}"
+        )
+        return result
+    except RelayError as exc:
+        app.logger.exception(
+            "PPPoE relay enable failed sub_id=%s username=%s",
+            sub_id,
+            username,
+        )
+        return {"ok": False, "message": f"PPPoE relay enable failed: {exc}"}
+
+
+def _reconnect_hotspot(app, subscription, reason: str) -> Dict[str, Any]:
+    if not app.config.get("ROUTER_AGENT_ENABLED", False):
+        return _agent_disabled_result()
+
+    _, sub_id, customer_id = _subscription_meta(subscription)
+    username = _hotspot_username(subscription)
+    if not username:
+        return {"ok": False, "message": "Missing hotspot_username"}
+
+    try:
+        # Read the package once; Subscription.package is joined-loaded,
+        # so this does not go back to the DB per attribute.
+        package = subscription.package
+        profile = package.mikrotik_profile
+        max_devices = package.max_devices
+        expires_at = subscription.expires_at
+
+        ensure_hotspot_user(
+            app,
+            username=username,
+            profile=profile,
+            expires_at=expires_at,
+            comment_extra=f"max_devices={max_devices} reason={reason}",
+        )
+        removed = kick_hotspot_active(app, username)
+
+        result = {
+            "ok": True,
+            "message": "Hotspot enabled + kicked",
+            "meta": {"removed": removed},
+        }
+        _log(
+            f"RECONNECT OK sub_id={sub_id} customer_id={customer_id} "
+            f"svc=hotspot username={username} result={result}"
+        )
+        return result
+    except Exception as exc:
+        app.logger.exception(
+            "Hotspot reconnect failed sub_id=%s username=%s",
+            sub_id,
+            username,
+        )
+        return {"ok": False, "message": f"Hotspot reconnect failed: {exc}"}
+
+
+_DISCONNECT_HANDLERS = {
+    "pppoe": _disconnect_pppoe,
+    "hotspot": _disconnect_hotspot,
+}
+
+_RECONNECT_HANDLERS = {
+    "pppoe": _reconnect_pppoe,
+    "hotspot": _reconnect_hotspot,
+}
+
+
 def disconnect_subscription(
     subscription,
     reason: str = "unpaid",
@@ -54,65 +246,14 @@ def disconnect_subscription(
     if dry_run:
         return {"ok": True, "dry_run": True, "message": "DRY RUN"}
 
-    if svc == "pppoe":
-        username = _pppoe_username(subscription)
-        if not username:
-            return {"ok": False, "message": "Missing pppoe_username"}
-
-        try:
-            relay_result = disable_pppoe(username, disconnect=True)
-            result = {
-                "ok": True,
-                "message": "PPPoE disabled via relay",
-                "meta": {"relay": relay_result},
-            }
-            _log(
-                f"DISCONNECT OK sub_id={sub_id} customer_id={customer_id} "
-                f"svc={svc} username={username} result={result}"
-            )
-            return result
-        except RelayError as exc:
-            current_app.logger.exception(
-                "PPPoE relay disable failed sub_id=%s username=%s",
-                sub_id,
-                username,
-            )
-            return {"ok": False, "message": f"PPPoE relay disable failed: {exc}"}
-
-    if svc == "hotspot":
-        if not current_app.config.get("ROUTER_AGENT_ENABLED", False):
-            return {
-                "ok": False,
-                "skipped": True,
-                "message": "Router agent disabled (ROUTER_AGENT_ENABLED=false)",
-            }
-
-        username = _hotspot_username(subscription)
-        if not username:
-            return {"ok": False, "message": "Missing hotspot_username"}
-
-        try:
-            disable_hotspot_user(current_app, username)
-            removed = kick_hotspot_active(current_app, username)
-            result = {
-                "ok": True,
-                "message": "Hotspot disabled + kicked",
-                "meta": {"removed": removed},
-            }
-            _log(
-                f"DISCONNECT OK sub_id={sub_id} customer_id={customer_id} "
-                f"svc={svc} username={username} result={result}"
-            )
-            return result
-        except Exception as exc:
-            current_app.logger.exception(
-                "Hotspot disconnect failed sub_id=%s username=%s",
-                sub_id,
-                username,
-            )
-            return {"ok": False, "message": f"Hotspot disconnect failed: {exc}"}
-
-    return {"ok": False, "message": f"Unknown service_type: {svc}"}
+    handler = _DISCONNECT_HANDLERS.get(svc)
+    if handler is None:
+        return {"ok": False, "message": f"Unknown service_type: {svc}"}
+
+    with _subscription_router_lock(sub_id) as got:
+        if not got:
+            return _concurrent_op_result()
+        return handler(current_app, subscription, reason)
 
 
 def reconnect_subscription(
@@ -130,76 +271,14 @@ def reconnect_subscription(
     if dry_run:
         return {"ok": True, "dry_run": True, "message": "DRY RUN"}
 
-    if svc == "pppoe":
-        username = _pppoe_username(subscription)
-        if not username:
-            return {"ok": False, "message": "Missing pppoe_username"}
-
-        try:
-            relay_result = enable_pppoe(username, disconnect=True)
-            result = {
-                "ok": True,
-                "message": "PPPoE enabled via relay",
-                "meta": {"relay": relay_result},
-            }
-            _log(
-                f"RECONNECT OK sub_id={sub_id} customer_id={customer_id} "
-                f"svc={svc} username={username} result={result}"
-            )
-            return result
-        except RelayError as exc:
-            current_app.logger.exception(
-                "PPPoE relay enable failed sub_id=%s username=%s",
-                sub_id,
-                username,
-            )
-            return {"ok": False, "message": f"PPPoE relay enable failed: {exc}"}
-
-    if svc == "hotspot":
-        if not current_app.config.get("ROUTER_AGENT_ENABLED", False):
-            return {
-                "ok": False,
-                "skipped": True,
-                "message": "Router agent disabled (ROUTER_AGENT_ENABLED=false)",
-            }
-
-        username = _hotspot_username(subscription)
-        if not username:
-            return {"ok": False, "message": "Missing hotspot_username"}
-
-        try:
-            profile = subscription.package.mikrotik_profile
-            expires_at = subscription.expires_at
-            max_devices = subscription.package.max_devices
-
-            ensure_hotspot_user(
-                current_app,
-                username=username,
-                profile=profile,
-                expires_at=expires_at,
-                comment_extra=f"max_devices={max_devices} reason={reason}",
-            )
-            removed = kick_hotspot_active(current_app, username)
-
-            result = {
-                "ok": True,
-                "message": "Hotspot enabled + kicked",
-                "meta": {"removed": removed},
-            }
-            _log(
-                f"RECONNECT OK sub_id={sub_id} customer_id={customer_id} "
-                f"svc={svc} username={username} result={result}"
-            )
-            return result
-        except Exception as exc:
-            current_app.logger.exception(
-                "Hotspot reconnect failed sub_id=%s username=%s",
-                sub_id,
-                username,
-            )
-            return {"ok": False, "message": f"Hotspot reconnect failed: {exc}"}
-
-    return {"ok": False, "message": f"Unknown service_type: {svc}"}
+    handler = _RECONNECT_HANDLERS.get(svc)
+    if handler is None:
+        return {"ok": False, "message": f"Unknown service_type: {svc}"}
+
+    with _subscription_router_lock(sub_id) as got:
+        if not got:
+            return _concurrent_op_result()
+        return handler(current_app, subscription, reason)
 
 
 def disconnect_pppoe_only(username: str, dry_run: bool = True) -> Dict[str, Any]:
@@ -40,36 +40,41 @@ def upgrade():
         """
     )
 
-    # Create the unique index if it does not exist
-    op.execute(
-        """
-        CREATE UNIQUE INDEX IF NOT EXISTS ix_customers_pppoe_username
-        ON customers (pppoe_username);
-        """
-    )
-
     # ---------------------------------------------------------
-    # subscriptions: drop partial unique indexes if they exist,
-    # then add helpful lookup indexes
+    # subscriptions: drop partial unique indexes if they exist
     # ---------------------------------------------------------
 
     # Drop partial indexes defensively (names matter; use exact names)
     op.execute("DROP INDEX IF EXISTS uq_active_hotspot_username;")
     op.execute("DROP INDEX IF EXISTS uq_active_pppoe_username;")
 
-    # Create normal indexes if missing
-    op.execute(
-        """
-        CREATE INDEX IF NOT EXISTS ix_subscriptions_created_at
-        ON subscriptions (created_at);
-        """
-    )
-    op.execute(
-        """
-        CREATE INDEX IF NOT EXISTS ix_subscriptions_service_type
-        ON subscriptions (service_type);
-        """
-    )
+    # ---------------------------------------------------------
+    # Index builds on populated tables: CONCURRENTLY so writes to
+    # customers/subscriptions are not blocked during the build.
+    # (Must run outside the migration transaction.)
+    # ---------------------------------------------------------
+    with op.get_context().autocommit_block():
+        # Create the unique index if it does not exist
+        op.execute(
+            """
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_customers_pppoe_username
+            ON customers (pppoe_username);
+            """
+        )
+
+        # Create normal indexes if missing
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_created_at
+            ON subscriptions (created_at);
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_service_type
+            ON subscriptions (service_type);
+            """
+        )
 
 
 def downgrade():
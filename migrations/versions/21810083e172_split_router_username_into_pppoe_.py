@@ -23,38 +23,34 @@ def upgrade():
     op.add_column("subscriptions", sa.Column("hotspot_username", sa.String(length=64), nullable=True))
 
     # ---------------------------------------------------------
-    # 2) Add indexes (non-unique; uniqueness is enforced via partial indexes below)
-    # ---------------------------------------------------------
-    op.create_index("ix_subscriptions_pppoe_username", "subscriptions", ["pppoe_username"], unique=False)
-    op.create_index("ix_subscriptions_hotspot_username", "subscriptions", ["hotspot_username"], unique=False)
-
-    # ---------------------------------------------------------
-    # 3) Backfill from existing router_username using service_type
+    # 2) Backfill from existing router_username using service_type
     # - PPPoE: router_username -> pppoe_username
     # - Hotspot: router_username -> hotspot_username
+    # Single pass: one scan of subscriptions, each row written at most once.
     # ---------------------------------------------------------
     op.execute(
         """
         UPDATE subscriptions
-        SET pppoe_username = router_username
-        WHERE service_type = 'pppoe'
-          AND router_username IS NOT NULL
-          AND pppoe_username IS NULL;
-        """
-    )
-
-    op.execute(
-        """
-        UPDATE subscriptions
-        SET hotspot_username = router_username
-        WHERE service_type = 'hotspot'
-          AND router_username IS NOT NULL
-          AND hotspot_username IS NULL;
+        SET pppoe_username = CASE
+                WHEN service_type = 'pppoe' AND pppoe_username IS NULL
+                THEN router_username
+                ELSE pppoe_username
+            END,
+            hotspot_username = CASE
+                WHEN service_type = 'hotspot' AND hotspot_username IS NULL
+                THEN router_username
+                ELSE hotspot_username
+            END
+        WHERE router_username IS NOT NULL
+          AND (
+                (service_type = 'pppoe' AND pppoe_username IS NULL)
+             OR (service_type = 'hotspot' AND hotspot_username IS NULL)
+          );
         """
     )
 
     # ---------------------------------------------------------
-    # 4) Make router_username nullable (deprecate the overloaded field)
+    # 3) Make router_username nullable (deprecate the overloaded field)
     #    Keep the column for now to avoid breaking older code paths,
     #    but new code should stop writing to it.
     # ---------------------------------------------------------
@@ -66,29 +62,45 @@ def upgrade():
     )
 
     # ---------------------------------------------------------
-    # 5) Industry-grade duplicate prevention
-    #    Prevent duplicate ACTIVE accounts per username by service type.
+    # 4) Indexes, built CONCURRENTLY so subscriptions stays writable.
+    #    CONCURRENTLY cannot run inside a transaction, so this commits
+    #    the column/backfill work above first.
+    #
+    #    Non-unique lookups, plus industry-grade duplicate prevention:
+    #    no duplicate ACTIVE accounts per username by service type.
     #    (Allows history: expired/pending rows are fine.)
     # ---------------------------------------------------------
-    op.execute(
-        """
-        CREATE UNIQUE INDEX IF NOT EXISTS uq_active_pppoe_username
-        ON subscriptions (pppoe_username)
-        WHERE service_type = 'pppoe'
-          AND status = 'active'
-          AND pppoe_username IS NOT NULL;
-        """
-    )
-
-    op.execute(
-        """
-        CREATE UNIQUE INDEX IF NOT EXISTS uq_active_hotspot_username
-        ON subscriptions (hotspot_username)
-        WHERE service_type = 'hotspot'
-          AND status = 'active'
-          AND hotspot_username IS NOT NULL;
-        """
-    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_pppoe_username
+            ON subscriptions (pppoe_username);
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_hotspot_username
+            ON subscriptions (hotspot_username);
+            """
+        )
+        op.execute(
+            """
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_active_pppoe_username
+            ON subscriptions (pppoe_username)
+            WHERE service_type = 'pppoe'
+              AND status = 'active'
+              AND pppoe_username IS NOT NULL;
+            """
+        )
+        op.execute(
+            """
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_active_hotspot_username
+            ON subscriptions (hotspot_username)
+            WHERE service_type = 'hotspot'
+              AND status = 'active'
+              AND hotspot_username IS NOT NULL;
+            """
+        )
 
 
 def downgrade():
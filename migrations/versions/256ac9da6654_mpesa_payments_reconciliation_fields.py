@@ -6,7 +6,6 @@ Create Date: 2026-02-14 16:51:14.972695
 
 """
 from alembic import op
-import sqlalchemy as sa
 
 
 # revision identifiers, used by Alembic.
@@ -17,22 +16,36 @@ depends_on = None
 
 
 def upgrade():
-    op.add_column("mpesa_payments", sa.Column("result_code", sa.Integer(), nullable=True))
-    op.add_column("mpesa_payments", sa.Column("result_desc", sa.Text(), nullable=True))
-    op.add_column("mpesa_payments", sa.Column("external_updated_at", sa.DateTime(timezone=True), nullable=True))
-
-    op.add_column("mpesa_payments", sa.Column("reconcile_attempts", sa.Integer(), nullable=False, server_default="0"))
-    op.add_column("mpesa_payments", sa.Column("last_reconcile_at", sa.DateTime(timezone=True), nullable=True))
-
-    op.add_column("mpesa_payments", sa.Column("activation_attempts", sa.Integer(), nullable=False, server_default="0"))
-    op.add_column("mpesa_payments", sa.Column("last_activation_at", sa.DateTime(timezone=True), nullable=True))
-    op.add_column("mpesa_payments", sa.Column("activation_error", sa.Text(), nullable=True))
-
-    # Helpful indexes
-    op.create_index("ix_mpesa_payments_status", "mpesa_payments", ["status"])
-    op.create_index("ix_mpesa_payments_status_created_at", "mpesa_payments", ["status", "created_at"])
-    op.create_index("ix_mpesa_payments_subscription_id", "mpesa_payments", ["subscription_id"])
-    op.create_index("ix_mpesa_payments_paid_at", "mpesa_payments", ["paid_at"])
+    # One ALTER TABLE for all columns: the ACCESS EXCLUSIVE lock on
+    # mpesa_payments is taken once, not once per column. The NOT NULL
+    # DEFAULT 0 columns are metadata-only on PG11+ (no table rewrite).
+    op.execute(
+        """
+        ALTER TABLE mpesa_payments
+            ADD COLUMN result_code integer,
+            ADD COLUMN result_desc text,
+            ADD COLUMN external_updated_at timestamptz,
+            ADD COLUMN reconcile_attempts integer NOT NULL DEFAULT 0,
+            ADD COLUMN last_reconcile_at timestamptz,
+            ADD COLUMN activation_attempts integer NOT NULL DEFAULT 0,
+            ADD COLUMN last_activation_at timestamptz,
+            ADD COLUMN activation_error text;
+        """
+    )
+
+    # Helpful indexes. mpesa_payments takes STK callback writes constantly, so
+    # build CONCURRENTLY (outside the migration transaction) to avoid blocking them.
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mpesa_payments_status ON mpesa_payments (status)")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mpesa_payments_status_created_at "
+            "ON mpesa_payments (status, created_at)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mpesa_payments_subscription_id "
+            "ON mpesa_payments (subscription_id)"
+        )
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mpesa_payments_paid_at ON mpesa_payments (paid_at)")
 
 def downgrade():
     op.drop_index("ix_mpesa_payments_paid_at", table_name="mpesa_payments")
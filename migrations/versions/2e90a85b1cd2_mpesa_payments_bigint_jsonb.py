@@ -0,0 +1,126 @@
+"""mpesa_payments: bigint id, jsonb raw_callback, pending + BRIN created_at indexes
+
+Revision ID: 2e90a85b1cd2
+Revises: 4d81b6f3e0a2
+Create Date: 2026-10-16 17:02:11.408317
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "2e90a85b1cd2"
+down_revision = "4d81b6f3e0a2"
+branch_labels = None
+depends_on = None
+
+
+def _column_types(bind) -> dict[str, str]:
+    """information_schema data_type for mpesa_payments.id / raw_callback."""
+    rows = bind.execute(
+        sa.text(
+            """
+            SELECT column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = 'public'
+              AND table_name = 'mpesa_payments'
+              AND column_name IN ('id', 'raw_callback')
+            """
+        )
+    )
+    return {name: data_type for name, data_type in rows}
+
+
+def upgrade():
+    bind = op.get_bind()
+    types = _column_types(bind)
+
+    # ---------------------------------------------------------
+    # BIGINT id: payments only ever grow, and widening the PK once the
+    # table is large is a far longer rewrite than doing it now.
+    # JSONB raw_callback: stored parsed, so reads don't re-parse the
+    # Daraja payload.
+    #
+    # Both changes rewrite the table, so they go out as one ALTER (one
+    # rewrite, one ACCESS EXCLUSIVE lock), with lock_timeout only (see
+    # migrations/README). Skipped entirely where the columns already have
+    # the target types.
+    # ---------------------------------------------------------
+    alters = []
+    if types.get("id") == "integer":
+        alters.append("ALTER COLUMN id TYPE bigint")
+    if types.get("raw_callback") == "json":
+        alters.append("ALTER COLUMN raw_callback TYPE jsonb USING raw_callback::jsonb")
+
+    if alters:
+        op.execute("SET LOCAL lock_timeout = '2s'")
+        op.execute(f"ALTER TABLE mpesa_payments {', '.join(alters)};")
+        op.execute("SET LOCAL lock_timeout TO DEFAULT")
+
+    # The serial sequence is still typed integer; widen it to match.
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            seq text := pg_get_serial_sequence('mpesa_payments', 'id');
+        BEGIN
+            IF seq IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s AS bigint', seq);
+            END IF;
+        END $$;
+        """
+    )
+
+    # ---------------------------------------------------------
+    # Reconcile job polls stalled STK pushes: status = 'pending' ordered by
+    # created_at. Most payments leave 'pending' within seconds, so the
+    # partial index stays tiny. created_at is insert-ordered, so BRIN
+    # serves date-range reporting at a fraction of a b-tree's size.
+    #
+    # Built CONCURRENTLY (outside the migration transaction) so STK
+    # callbacks keep writing.
+    # ---------------------------------------------------------
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mpesa_payments_pending
+            ON mpesa_payments (created_at)
+            WHERE status = 'pending';
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_mpesa_payments_created_at
+            ON mpesa_payments USING BRIN (created_at) WITH (pages_per_range = 32);
+            """
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_mpesa_payments_created_at;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_mpesa_payments_pending;")
+
+    # Fails if ids have already passed the integer range, which is the point
+    # of keeping them bigint.
+    op.execute("SET LOCAL lock_timeout = '2s'")
+    op.execute(
+        """
+        ALTER TABLE mpesa_payments
+            ALTER COLUMN raw_callback TYPE json USING raw_callback::json,
+            ALTER COLUMN id TYPE integer;
+        """
+    )
+    op.execute("SET LOCAL lock_timeout TO DEFAULT")
+    op.execute(
+        """
+        DO $$
+        DECLARE
+            seq text := pg_get_serial_sequence('mpesa_payments', 'id');
+        BEGIN
+            IF seq IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s AS integer', seq);
+            END IF;
+        END $$;
+        """
+    )
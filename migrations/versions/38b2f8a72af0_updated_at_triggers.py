@@ -0,0 +1,71 @@
+"""updated_at triggers
+
+Revision ID: 38b2f8a72af0
+Revises: 2e90a85b1cd2
+Create Date: 2026-10-16 17:20:46.153902
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "38b2f8a72af0"
+down_revision = "2e90a85b1cd2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ---------------------------------------------------------
+    # updated_at maintained in the database so every UPDATE path (ORM,
+    # raw SQL, reconcile job) bumps it. mpesa_payments.updated_at is
+    # timestamptz, so plain now(); customer_locations / tickets keep naive
+    # UTC columns like the rest of the schema, so set_updated_at_utc()
+    # writes timezone('utc', now()).
+    #
+    # CREATE OR REPLACE / DROP IF EXISTS: safe to rerun.
+    # ---------------------------------------------------------
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = now();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_mpesa_payments_updated_at ON mpesa_payments;
+        CREATE TRIGGER trg_mpesa_payments_updated_at
+            BEFORE UPDATE ON mpesa_payments
+            FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+        CREATE OR REPLACE FUNCTION set_updated_at_utc() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = timezone('utc', now());
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS trg_customer_locations_updated_at ON customer_locations;
+        CREATE TRIGGER trg_customer_locations_updated_at
+            BEFORE UPDATE ON customer_locations
+            FOR EACH ROW EXECUTE FUNCTION set_updated_at_utc();
+
+        DROP TRIGGER IF EXISTS trg_tickets_updated_at ON tickets;
+        CREATE TRIGGER trg_tickets_updated_at
+            BEFORE UPDATE ON tickets
+            FOR EACH ROW EXECUTE FUNCTION set_updated_at_utc();
+        """
+    )
+
+
+def downgrade():
+    op.execute(
+        """
+        DROP TRIGGER IF EXISTS trg_tickets_updated_at ON tickets;
+        DROP TRIGGER IF EXISTS trg_customer_locations_updated_at ON customer_locations;
+        DROP FUNCTION IF EXISTS set_updated_at_utc();
+
+        DROP TRIGGER IF EXISTS trg_mpesa_payments_updated_at ON mpesa_payments;
+        DROP FUNCTION IF EXISTS set_updated_at();
+        """
+    )
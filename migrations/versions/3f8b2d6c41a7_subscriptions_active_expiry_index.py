@@ -0,0 +1,61 @@
+"""subscriptions: replace status/expires_at/mac_address indexes with active expiry index
+
+Revision ID: 3f8b2d6c41a7
+Revises: 5c1e9a7d3b20
+Create Date: 2026-10-16 10:41:05.527310
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f8b2d6c41a7"
+down_revision = "5c1e9a7d3b20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ---------------------------------------------------------
+    # 9fc22be0664d added single-column indexes on status, expires_at
+    # and mac_address. The hot read is the expiry sweep
+    # (status = 'active' AND expires_at <= now), which a partial
+    # composite serves directly. Nothing looks subscriptions up by
+    # mac_address, so that index is pure write overhead.
+    #
+    # Built CONCURRENTLY (outside the migration transaction) so
+    # subscriptions stays writable.
+    # ---------------------------------------------------------
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_status_expires
+            ON subscriptions (status, expires_at)
+            WHERE status = 'active';
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_status;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_expires_at;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_mac_address;")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_mac_address
+            ON subscriptions (mac_address);
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_expires_at
+            ON subscriptions (expires_at);
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_status
+            ON subscriptions (status);
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_status_expires;")
@@ -0,0 +1,34 @@
+"""expense_categories: partial root-name index
+
+Revision ID: 4092696796e2
+Revises: 51db8dd38dd1
+Create Date: 2026-10-16 18:58:43.119027
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4092696796e2"
+down_revision = "51db8dd38dd1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Root-category lookups (parent_id IS NULL AND name = ...) are what the
+    # admin "add category" check runs. The partial index answers them
+    # without filtering parent_id per probe. CONCURRENTLY (outside the
+    # migration transaction) so expense_categories stays writable.
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_expense_categories_root_name
+            ON expense_categories (name)
+            WHERE parent_id IS NULL;
+            """
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_expense_categories_root_name;")
@@ -0,0 +1,60 @@
+"""subscriptions: make ix_subscriptions_pending_package_id partial
+
+Revision ID: 4d81b6f3e0a2
+Revises: e2c4a7b915d3
+Create Date: 2026-10-16 16:05:52.731640
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "4d81b6f3e0a2"
+down_revision = "e2c4a7b915d3"
+branch_labels = None
+depends_on = None
+
+
+def _index_is_partial(bind) -> bool | None:
+    """True/False for partial/full ix_subscriptions_pending_package_id, None if missing."""
+    return bind.execute(
+        sa.text(
+            """
+            SELECT i.indpred IS NOT NULL
+            FROM pg_index i
+            JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE c.relname = 'ix_subscriptions_pending_package_id'
+            """
+        )
+    ).scalar()
+
+
+def _rebuild_partial() -> None:
+    # Build the replacement first and swap names, so lookups and the FK's
+    # ON DELETE action are never left without an index. All CONCURRENTLY.
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_pending_package_id_new;")
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY ix_subscriptions_pending_package_id_new
+            ON subscriptions (pending_package_id)
+            WHERE pending_package_id IS NOT NULL;
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_pending_package_id;")
+        op.execute(
+            "ALTER INDEX ix_subscriptions_pending_package_id_new "
+            "RENAME TO ix_subscriptions_pending_package_id;"
+        )
+
+
+def upgrade():
+    # Fresh databases already get the partial index from 6a3f0c8e2d17;
+    # ones migrated earlier carry the full index from the original f6e7d73af2c9.
+    if _index_is_partial(op.get_bind()) is not True:
+        _rebuild_partial()
+
+
+def downgrade():
+    # 6a3f0c8e2d17 builds the partial index too; nothing earlier to restore.
+    pass
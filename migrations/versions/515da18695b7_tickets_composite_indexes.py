@@ -0,0 +1,105 @@
+"""tickets / ticket_updates: composite, covering and BRIN indexes
+
+Revision ID: 515da18695b7
+Revises: 823cbdfc841d
+Create Date: 2026-10-16 18:04:19.370554
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "515da18695b7"
+down_revision = "823cbdfc841d"
+branch_labels = None
+depends_on = None
+
+
+def _index_method(bind, name: str) -> str | None:
+    """Access method ('btree', 'brin', ...) of index `name`, None if missing."""
+    return bind.execute(
+        sa.text(
+            """
+            SELECT am.amname
+            FROM pg_class c
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE c.relname = :name AND c.relkind = 'i'
+            """
+        ),
+        {"name": name},
+    ).scalar()
+
+
+def _rebuild_created_at(using: str) -> None:
+    # Same index name, different access method: build the replacement under
+    # a temporary name and swap, so created_at range scans always have an
+    # index. All CONCURRENTLY.
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_ticket_updates_created_at_new;")
+        op.execute(
+            f"""
+            CREATE INDEX CONCURRENTLY ix_ticket_updates_created_at_new
+            ON ticket_updates {using};
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_ticket_updates_created_at;")
+        op.execute(
+            "ALTER INDEX ix_ticket_updates_created_at_new "
+            "RENAME TO ix_ticket_updates_created_at;"
+        )
+
+
+def upgrade():
+    # ---------------------------------------------------------
+    # "Open tickets for customer X, newest first" is one range scan on the
+    # composite (it also covers customer_id-only lookups / FK cascades).
+    # The assignee inbox index only holds tickets that are still open.
+    # Ticket history (ticket_id, ordered by created_at) is one range scan
+    # on the covering index, which also serves ticket_id-only lookups.
+    # These replace the single-column customer_id / status / ticket_id
+    # indexes from 94f093d8a103.
+    #
+    # Built CONCURRENTLY (outside the migration transaction) so tickets
+    # stay writable; new indexes go in before the old ones are dropped.
+    # ---------------------------------------------------------
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tickets_customer_status_opened
+            ON tickets (customer_id, status, opened_at_utc DESC);
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tickets_assignee_status_priority
+            ON tickets (assigned_to_admin_id, status, priority)
+            WHERE status IN ('open', 'assigned', 'in_progress', 'waiting_customer');
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ticket_updates_ticket_time
+            ON ticket_updates (ticket_id, created_at DESC) INCLUDE (status_to, actor_admin_id);
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tickets_customer_id;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tickets_status;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_ticket_updates_ticket_id;")
+
+    # ticket_updates is append-only and time-correlated: BRIN is a tiny
+    # fraction of the b-tree and still serves created_at range scans.
+    if _index_method(op.get_bind(), "ix_ticket_updates_created_at") != "brin":
+        _rebuild_created_at("USING BRIN (created_at) WITH (pages_per_range = 32)")
+
+
+def downgrade():
+    if _index_method(op.get_bind(), "ix_ticket_updates_created_at") != "btree":
+        _rebuild_created_at("(created_at)")
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_ticket_updates_ticket_id ON ticket_updates (ticket_id);")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tickets_status ON tickets (status);")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tickets_customer_id ON tickets (customer_id);")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_ticket_updates_ticket_time;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tickets_assignee_status_priority;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_tickets_customer_status_opened;")
@@ -0,0 +1,130 @@
+"""admin_audit_logs: bigint id, covering user/time index, BRIN created_at
+
+Revision ID: 51db8dd38dd1
+Revises: 5d6f79e8a783
+Create Date: 2026-10-16 18:40:08.271936
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "51db8dd38dd1"
+down_revision = "5d6f79e8a783"
+branch_labels = None
+depends_on = None
+
+
+def _id_type(bind) -> str | None:
+    return bind.execute(
+        sa.text(
+            """
+            SELECT data_type
+            FROM information_schema.columns
+            WHERE table_schema = 'public'
+              AND table_name = 'admin_audit_logs'
+              AND column_name = 'id'
+            """
+        )
+    ).scalar()
+
+
+def _index_method(bind, name: str) -> str | None:
+    """Access method ('btree', 'brin', ...) of index `name`, None if missing."""
+    return bind.execute(
+        sa.text(
+            """
+            SELECT am.amname
+            FROM pg_class c
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE c.relname = :name AND c.relkind = 'i'
+            """
+        ),
+        {"name": name},
+    ).scalar()
+
+
+def _set_id_type(type_: str) -> None:
+    # Table rewrite: lock_timeout only; see migrations/README.
+    op.execute("SET LOCAL lock_timeout = '2s'")
+    op.execute(f"ALTER TABLE admin_audit_logs ALTER COLUMN id TYPE {type_};")
+    op.execute("SET LOCAL lock_timeout TO DEFAULT")
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            seq text := pg_get_serial_sequence('admin_audit_logs', 'id');
+        BEGIN
+            IF seq IS NOT NULL THEN
+                EXECUTE format('ALTER SEQUENCE %s AS {type_}', seq);
+            END IF;
+        END $$;
+        """
+    )
+
+
+def _rebuild_created_at(using: str) -> None:
+    # Same index name, different access method: build the replacement under
+    # a temporary name and swap, so created_at range scans always have an
+    # index. All CONCURRENTLY.
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_admin_audit_logs_created_at_new;")
+        op.execute(
+            f"""
+            CREATE INDEX CONCURRENTLY ix_admin_audit_logs_created_at_new
+            ON admin_audit_logs {using};
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_admin_audit_logs_created_at;")
+        op.execute(
+            "ALTER INDEX ix_admin_audit_logs_created_at_new "
+            "RENAME TO ix_admin_audit_logs_created_at;"
+        )
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    # The audit log only ever grows; widen the PK while that is still cheap.
+    if _id_type(bind) == "integer":
+        _set_id_type("bigint")
+
+    # ---------------------------------------------------------
+    # "Recent actions by admin X": the covering index answers it with an
+    # index-only scan and still serves admin_user_id-only / FK lookups, so
+    # it replaces ix_admin_audit_logs_admin_user_id. CONCURRENTLY so audit
+    # writes (every admin action) are not blocked.
+    # ---------------------------------------------------------
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_admin_audit_logs_user_time
+            ON admin_audit_logs (admin_user_id, created_at DESC) INCLUDE (action);
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_admin_audit_logs_admin_user_id;")
+
+    # Append-only and time-correlated: BRIN is a tiny fraction of a b-tree
+    # and still serves created_at range scans.
+    if _index_method(bind, "ix_admin_audit_logs_created_at") != "brin":
+        _rebuild_created_at("USING BRIN (created_at) WITH (pages_per_range = 32)")
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    if _index_method(bind, "ix_admin_audit_logs_created_at") != "btree":
+        _rebuild_created_at("(created_at)")
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_admin_audit_logs_admin_user_id
+            ON admin_audit_logs (admin_user_id);
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_admin_audit_logs_user_time;")
+
+    # Fails if ids have already passed the integer range.
+    if _id_type(bind) == "bigint":
+        _set_id_type("integer")
@@ -0,0 +1,54 @@
+"""subscriptions: replace service_type index with partial active indexes
+
+Revision ID: 5c1e9a7d3b20
+Revises: 0e57a632a440
+Create Date: 2026-10-16 09:12:40.118204
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5c1e9a7d3b20"
+down_revision = "0e57a632a440"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ---------------------------------------------------------
+    # service_type only has two values (pppoe / hotspot), so a plain
+    # b-tree on it is rarely chosen by the planner but is maintained
+    # on every write. Replace it with partial indexes matching the
+    # real lookups: active subscriptions of one service for a customer.
+    #
+    # Built CONCURRENTLY (outside the migration transaction) so
+    # subscriptions stays writable.
+    # ---------------------------------------------------------
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subs_pppoe_active
+            ON subscriptions (customer_id)
+            WHERE service_type = 'pppoe' AND status = 'active';
+            """
+        )
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subs_hotspot_active
+            ON subscriptions (customer_id)
+            WHERE service_type = 'hotspot' AND status = 'active';
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_service_type;")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_service_type
+            ON subscriptions (service_type);
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subs_hotspot_active;")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subs_pppoe_active;")
@@ -0,0 +1,48 @@
+"""customer_locations / public_leads: drop ix_customer_locations_active, add ix_public_leads_unhandled
+
+Revision ID: 5d6f79e8a783
+Revises: 515da18695b7
+Create Date: 2026-10-16 18:22:57.604183
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d6f79e8a783"
+down_revision = "515da18695b7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ---------------------------------------------------------
+    # customer_locations: uq_customer_one_active_location (partial unique
+    # on customer_id WHERE active) already serves "active location"
+    # lookups, so the b-tree on the boolean is pure write overhead.
+    #
+    # public_leads: admin inbox reads open leads newest first; the
+    # partial index only holds unhandled rows.
+    #
+    # CONCURRENTLY (outside the migration transaction) so both tables
+    # stay writable.
+    # ---------------------------------------------------------
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_customer_locations_active;")
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_public_leads_unhandled
+            ON public_leads (created_at DESC)
+            WHERE handled = false;
+            """
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_public_leads_unhandled;")
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_customer_locations_active
+            ON customer_locations (active);
+            """
+        )
@@ -0,0 +1,34 @@
+"""subscriptions pending_package_id index
+
+Revision ID: 6a3f0c8e2d17
+Revises: f6e7d73af2c9
+Create Date: 2026-10-16 14:02:11.480931
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6a3f0c8e2d17'
+down_revision = 'f6e7d73af2c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY so subscriptions stays writable during the build.
+    # Partial: almost every subscription has no pending change, and the FK
+    # action / pending-renewal lookups only ever probe non-NULL values.
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_pending_package_id
+            ON subscriptions (pending_package_id)
+            WHERE pending_package_id IS NOT NULL;
+            """
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_pending_package_id;")
@@ -31,12 +31,11 @@ def upgrade():
     )
 
     # Indexes (safe even if already exists)
+    # ix_public_leads_created_at already comes from 21a382072aa5.
     op.execute("CREATE INDEX IF NOT EXISTS ix_public_leads_handled ON public_leads (handled)")
-    op.execute("CREATE INDEX IF NOT EXISTS ix_public_leads_created_at ON public_leads (created_at)")
 
 def downgrade():
     # Safe drops
-    op.execute("DROP INDEX IF EXISTS ix_public_leads_created_at")
     op.execute("DROP INDEX IF EXISTS ix_public_leads_handled")
 
     op.drop_column("public_leads", "handled_by")
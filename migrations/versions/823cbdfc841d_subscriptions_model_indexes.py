@@ -0,0 +1,45 @@
+"""subscriptions: BRIN created_at index
+
+Revision ID: 823cbdfc841d
+Revises: 38b2f8a72af0
+Create Date: 2026-10-16 17:41:30.962118
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "823cbdfc841d"
+down_revision = "38b2f8a72af0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # ---------------------------------------------------------
+    # created_at is append-only and tracks the id order, so a BRIN index
+    # answers range scans at a fraction of a b-tree's size and write
+    # cost. Replaces the b-tree 07bfdd5b572b created.
+    #
+    # Built CONCURRENTLY (outside the migration transaction) so
+    # subscriptions stays writable; the BRIN goes in before the b-tree
+    # is dropped so range scans always have an index.
+    # ---------------------------------------------------------
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_created_at_brin
+            ON subscriptions USING BRIN (created_at) WITH (pages_per_range = 32);
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_created_at;")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            """
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_subscriptions_created_at
+            ON subscriptions (created_at);
+            """
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_subscriptions_created_at_brin;")
@@ -17,146 +17,194 @@ down_revision = "4177cf17ade1"
 branch_labels = None
 depends_on = None
 
+BACKFILL_BATCH_SIZE = 5000
+
 
 def upgrade() -> None:
-    # =========================================================
-    # 1) expense_categories (supports subcategories via parent_id)
-    # =========================================================
-    op.create_table(
-        "expense_categories",
-        sa.Column("id", sa.Integer(), primary_key=True),
-        sa.Column("name", sa.String(length=60), nullable=False),
-        sa.Column("parent_id", sa.Integer(), nullable=True),
-        sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.text("true")),
-        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
-        sa.ForeignKeyConstraint(
-            ["parent_id"],
-            ["expense_categories.id"],
-            name="expense_categories_parent_id_fkey",
-            ondelete="SET NULL",
-        ),
-    )
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+    existing_tables = set(insp.get_table_names(schema="public"))
 
-    op.create_index("ix_expense_categories_name", "expense_categories", ["name"])
-    op.create_index("ix_expense_categories_parent_id", "expense_categories", ["parent_id"])
-    op.create_unique_constraint(
-        "uq_expense_categories_parent_name",
-        "expense_categories",
-        ["parent_id", "name"],
-    )
+    # Existence guards make a rerun safe after a partial failure: the
+    # backfill below runs in autocommit batches, so everything before it is
+    # already committed if the loop dies halfway.
 
     # =========================================================
-    # 2) expense_templates (reusable named expenses)
+    # 1) expense_categories (supports subcategories via parent_id)
     # =========================================================
-    op.create_table(
-        "expense_templates",
-        sa.Column("id", sa.Integer(), primary_key=True),
-        sa.Column("category_id", sa.Integer(), nullable=False),
-        sa.Column("name", sa.String(length=80), nullable=False),  # e.g. "KPLC Bill"
-        sa.Column("default_amount", sa.Integer(), nullable=True),
-        sa.Column("notes", sa.Text(), nullable=True),
-        sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.text("true")),
-        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
-        sa.ForeignKeyConstraint(
-            ["category_id"],
-            ["expense_categories.id"],
-            name="expense_templates_category_id_fkey",
-            ondelete="RESTRICT",
-        ),
-    )
+    created_categories = "expense_categories" not in existing_tables
+    if created_categories:
+        op.create_table(
+            "expense_categories",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(length=60), nullable=False),
+            sa.Column("parent_id", sa.Integer(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.text("true")),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
+            sa.ForeignKeyConstraint(
+                ["parent_id"],
+                ["expense_categories.id"],
+                name="expense_categories_parent_id_fkey",
+                ondelete="SET NULL",
+            ),
+        )
+        op.create_unique_constraint(
+            "uq_expense_categories_parent_name",
+            "expense_categories",
+            ["parent_id", "name"],
+        )
 
-    op.create_index("ix_expense_templates_category_id", "expense_templates", ["category_id"])
-    op.create_index("ix_expense_templates_name", "expense_templates", ["name"])
-    op.create_unique_constraint(
-        "uq_expense_templates_category_name",
-        "expense_templates",
-        ["category_id", "name"],
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_expense_categories_name ON expense_categories (name);
+        CREATE INDEX IF NOT EXISTS ix_expense_categories_parent_id ON expense_categories (parent_id);
+        """
     )
 
     # =========================================================
-    # 3) Link expenses -> categories/templates
-    # Keep existing expenses.category TEXT for now to avoid breaking code.
+    # 2) expense_templates (reusable named expenses)
     # =========================================================
-    with op.batch_alter_table("expenses") as batch_op:
-        batch_op.add_column(sa.Column("category_id", sa.Integer(), nullable=True))
-        batch_op.add_column(sa.Column("template_id", sa.Integer(), nullable=True))
-
-        batch_op.create_foreign_key(
-            "expenses_category_id_fkey",
-            "expense_categories",
-            ["category_id"],
-            ["id"],
-            ondelete="SET NULL",
+    if "expense_templates" not in existing_tables:
+        op.create_table(
+            "expense_templates",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("category_id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=80), nullable=False),  # e.g. "KPLC Bill"
+            sa.Column("default_amount", sa.Integer(), nullable=True),
+            sa.Column("notes", sa.Text(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.text("true")),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("timezone('utc', now())")),
+            sa.ForeignKeyConstraint(
+                ["category_id"],
+                ["expense_categories.id"],
+                name="expense_templates_category_id_fkey",
+                ondelete="RESTRICT",
+            ),
         )
-        batch_op.create_foreign_key(
-            "expenses_template_id_fkey",
+        op.create_unique_constraint(
+            "uq_expense_templates_category_name",
             "expense_templates",
-            ["template_id"],
-            ["id"],
-            ondelete="SET NULL",
+            ["category_id", "name"],
         )
 
-        batch_op.create_index("ix_expenses_category_id", ["category_id"])
-        batch_op.create_index("ix_expenses_template_id", ["template_id"])
-
-    # =========================================================
-    # 4) Backfill: create root categories from existing expenses.category
-    # =========================================================
     op.execute(
         """
-        INSERT INTO expense_categories (name, parent_id, is_active, created_at)
-        SELECT DISTINCT
-            e.category,
-            NULL::integer,
-            true,
-            timezone('utc', now())
-        FROM expenses e
-        WHERE e.category IS NOT NULL
-          AND btrim(e.category) <> ''
-          AND NOT EXISTS (
-            SELECT 1
-            FROM expense_categories c
-            WHERE c.parent_id IS NULL
-              AND c.name = e.category
-          );
+        CREATE INDEX IF NOT EXISTS ix_expense_templates_category_id ON expense_templates (category_id);
+        CREATE INDEX IF NOT EXISTS ix_expense_templates_name ON expense_templates (name);
         """
     )
 
+    # =========================================================
+    # 3) Link expenses -> categories/templates
+    # Keep existing expenses.category TEXT for now to avoid breaking code.
+    # =========================================================
+    expense_columns = {c["name"] for c in insp.get_columns("expenses")}
+    if "category_id" not in expense_columns:
+        with op.batch_alter_table("expenses") as batch_op:
+            batch_op.add_column(sa.Column("category_id", sa.Integer(), nullable=True))
+            batch_op.add_column(sa.Column("template_id", sa.Integer(), nullable=True))
+
+            batch_op.create_foreign_key(
+                "expenses_category_id_fkey",
+                "expense_categories",
+                ["category_id"],
+                ["id"],
+                ondelete="SET NULL",
+            )
+            batch_op.create_foreign_key(
+                "expenses_template_id_fkey",
+                "expense_templates",
+                ["template_id"],
+                ["id"],
+                ondelete="SET NULL",
+            )
+
     op.execute(
         """
-        UPDATE expenses e
-        SET category_id = c.id
-        FROM expense_categories c
-        WHERE c.parent_id IS NULL
-          AND c.name = e.category
-          AND e.category_id IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_expenses_category_id ON expenses (category_id);
+        CREATE INDEX IF NOT EXISTS ix_expenses_template_id ON expenses (template_id);
         """
     )
 
+    # =========================================================
+    # 4) Backfill: create root categories from existing expenses.category
+    # expense_categories was created empty above, so there is nothing to
+    # de-duplicate against: no per-row NOT EXISTS probe needed.
+    # (ON CONFLICT would not help either: parent_id is NULL for roots and
+    # NULLs never conflict in uq_expense_categories_parent_name.)
+    # On a rerun the table already holds the committed roots: skip.
+    # =========================================================
+    # GROUP BY rather than DISTINCT lets the planner pick a hash aggregate
+    # over expenses instead of sort-unique; the transaction-local work_mem
+    # keeps that hash in memory (reset at this transaction's commit).
+    if created_categories:
+        op.execute("SET LOCAL work_mem = '256MB'")
+        op.execute(
+            """
+            INSERT INTO expense_categories (name, parent_id, is_active, created_at)
+            SELECT
+                btrim(e.category),
+                NULL::integer,
+                true,
+                timezone('utc', now())
+            FROM expenses e
+            WHERE e.category IS NOT NULL
+              AND btrim(e.category) <> ''
+            GROUP BY btrim(e.category);
+            """
+        )
+
+    # Link expenses to their category in id-range batches, each committed on
+    # its own (autocommit), so no single long transaction holds row locks
+    # across the whole expenses table.
+    with op.get_context().autocommit_block():
+        lo, hi = bind.execute(sa.text("SELECT min(id), max(id) FROM expenses")).one()
+        start = lo
+        while start is not None and start <= hi:
+            bind.execute(
+                sa.text(
+                    """
+                    UPDATE expenses e
+                    SET category_id = c.id
+                    FROM expense_categories c
+                    WHERE c.parent_id IS NULL
+                      AND c.name = btrim(e.category)
+                      AND e.category_id IS NULL
+                      AND e.id >= :start
+                      AND e.id < :stop;
+                    """
+                ),
+                {"start": start, "stop": start + BACKFILL_BATCH_SIZE},
+            )
+            start += BACKFILL_BATCH_SIZE
+
 
 def downgrade() -> None:
     # =========================================================
     # Reverse: remove expense links first
+    # IF EXISTS throughout so a half-applied upgrade can still be undone.
     # =========================================================
-    with op.batch_alter_table("expenses") as batch_op:
-        batch_op.drop_index("ix_expenses_template_id")
-        batch_op.drop_index("ix_expenses_category_id")
-
-        batch_op.drop_constraint("expenses_template_id_fkey", type_="foreignkey")
-        batch_op.drop_constraint("expenses_category_id_fkey", type_="foreignkey")
-
-        batch_op.drop_column("template_id")
-        batch_op.drop_column("category_id")
+    op.execute(
+        """
+        DROP INDEX IF EXISTS ix_expenses_template_id, ix_expenses_category_id;
+        ALTER TABLE expenses
+            DROP CONSTRAINT IF EXISTS expenses_template_id_fkey,
+            DROP CONSTRAINT IF EXISTS expenses_category_id_fkey,
+            DROP COLUMN IF EXISTS template_id,
+            DROP COLUMN IF EXISTS category_id;
+        """
+    )
 
     # =========================================================
     # Drop templates then categories
+    # (dropping a table drops its unique constraints with it)
     # =========================================================
-    op.drop_unique_constraint("uq_expense_templates_category_name", "expense_templates", type_="unique")
-    op.drop_index("ix_expense_templates_name", table_name="expense_templates")
-    op.drop_index("ix_expense_templates_category_id", table_name="expense_templates")
-    op.drop_table("expense_templates")
-
-    op.drop_unique_constraint("uq_expense_categories_parent_name", "expense_categories", type_="unique")
-    op.drop_index("ix_expense_categories_parent_id", table_name="expense_categories")
-    op.drop_index("ix_expense_categories_name", table_name="expense_categories")
-    op.drop_table("expense_categories")
+    op.execute(
+        """
+        DROP INDEX IF EXISTS ix_expense_templates_name, ix_expense_templates_category_id;
+        DROP TABLE IF EXISTS expense_templates;
+
+        DROP INDEX IF EXISTS ix_expense_categories_parent_id, ix_expense_categories_name;
+        DROP TABLE IF EXISTS expense_categories;
+        """
+    )
@@ -17,239 +17,284 @@ depends_on = None
 
 
 def upgrade() -> None:
+    # NOTE:
+    # All three tables are created empty in this revision, so their indexes
+    # are built with plain CREATE INDEX inside the migration transaction.
+    # CONCURRENTLY buys nothing here (no other session can see the tables
+    # yet) and would force committing half-created tables mid-migration.
+    # Use CONCURRENTLY only for new indexes on already-populated tables.
+    #
+    # Each table's indexes go out as one multi-statement op.execute, i.e. one
+    # round trip per table instead of one per index.
+    #
+    # Tables are created only if missing and every index statement is
+    # IF [NOT] EXISTS, so rerunning after a half-applied deploy (or
+    # downgrading one) doesn't stop on "relation already exists".
+
+    insp = sa.inspect(op.get_bind())
+    existing_tables = set(insp.get_table_names(schema="public"))
+
     # ---------------------------------------------------------
     # customer_locations
     # ---------------------------------------------------------
-    op.create_table(
-        "customer_locations",
-        sa.Column("id", sa.Integer(), primary_key=True),
-
-        sa.Column(
-            "customer_id",
-            sa.Integer(),
-            sa.ForeignKey("customers.id", ondelete="CASCADE"),
-            nullable=False,
-        ),
-
-        sa.Column("label", sa.String(length=80), nullable=True),
-
-        sa.Column("county", sa.String(length=60), nullable=True),
-        sa.Column("town", sa.String(length=60), nullable=True),
-        sa.Column("estate", sa.String(length=80), nullable=True),
-        sa.Column("apartment_name", sa.String(length=120), nullable=True),
-        sa.Column("house_no", sa.String(length=40), nullable=True),
-        sa.Column("landmark", sa.String(length=200), nullable=True),
-
-        sa.Column("gps_lat", sa.Numeric(9, 6), nullable=True),
-        sa.Column("gps_lng", sa.Numeric(9, 6), nullable=True),
-
-        sa.Column("notes", sa.Text(), nullable=True),
-
-        sa.Column("active", sa.Boolean(), nullable=False, server_default=sa.text("false")),
-        sa.Column("active_from_utc", sa.DateTime(), nullable=False),
-        sa.Column("active_to_utc", sa.DateTime(), nullable=True),
-
-        sa.Column(
-            "created_by_admin_id",
-            sa.Integer(),
-            sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
-            nullable=True,
-        ),
-
-        sa.Column(
-            "created_at",
-            sa.DateTime(),
-            nullable=False,
-            server_default=sa.text("timezone('utc', now())"),
-        ),
-        sa.Column(
-            "updated_at",
-            sa.DateTime(),
-            nullable=False,
-            server_default=sa.text("timezone('utc', now())"),
-        ),
-    )
-
-    op.create_index("ix_customer_locations_customer_id", "customer_locations", ["customer_id"])
-    op.create_index("ix_customer_locations_active", "customer_locations", ["active"])
-    op.create_index("ix_customer_locations_active_from_utc", "customer_locations", ["active_from_utc"])
-    op.create_index("ix_customer_locations_active_to_utc", "customer_locations", ["active_to_utc"])
-    op.create_index("ix_customer_locations_created_by_admin_id", "customer_locations", ["created_by_admin_id"])
-
-    # Enforce ONE active location per customer (Postgres partial unique index)
-    op.create_index(
-        "uq_customer_one_active_location",
-        "customer_locations",
-        ["customer_id"],
-        unique=True,
-        postgresql_where=sa.text("active = true"),
+    if "customer_locations" not in existing_tables:
+        op.create_table(
+            "customer_locations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+
+            sa.Column(
+                "customer_id",
+                sa.Integer(),
+                sa.ForeignKey("customers.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+
+            sa.Column("label", sa.String(length=80), nullable=True),
+
+            sa.Column("county", sa.String(length=60), nullable=True),
+            sa.Column("town", sa.String(length=60), nullable=True),
+            sa.Column("estate", sa.String(length=80), nullable=True),
+            sa.Column("apartment_name", sa.String(length=120), nullable=True),
+            sa.Column("house_no", sa.String(length=40), nullable=True),
+            sa.Column("landmark", sa.String(length=200), nullable=True),
+
+            sa.Column("gps_lat", sa.Numeric(9, 6), nullable=True),
+            sa.Column("gps_lng", sa.Numeric(9, 6), nullable=True),
+
+            sa.Column("notes", sa.Text(), nullable=True),
+
+            sa.Column("active", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+            sa.Column("active_from_utc", sa.DateTime(), nullable=False),
+            sa.Column("active_to_utc", sa.DateTime(), nullable=True),
+
+            sa.Column(
+                "created_by_admin_id",
+                sa.Integer(),
+                sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+
+            sa.Column(
+                "created_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("timezone('utc', now())"),
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("timezone('utc', now())"),
+            ),
+        )
+
+    # uq_customer_one_active_location enforces ONE active location per
+    # customer (Postgres partial unique index).
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_customer_locations_customer_id ON customer_locations (customer_id);
+        CREATE INDEX IF NOT EXISTS ix_customer_locations_active ON customer_locations (active);
+        CREATE INDEX IF NOT EXISTS ix_customer_locations_active_from_utc ON customer_locations (active_from_utc);
+        CREATE INDEX IF NOT EXISTS ix_customer_locations_active_to_utc ON customer_locations (active_to_utc);
+        CREATE INDEX IF NOT EXISTS ix_customer_locations_created_by_admin_id ON customer_locations (created_by_admin_id);
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_customer_one_active_location ON customer_locations (customer_id)
+            WHERE active = true;
+        """
     )
 
     # ---------------------------------------------------------
     # tickets
     # ---------------------------------------------------------
-    op.create_table(
-        "tickets",
-        sa.Column("id", sa.Integer(), primary_key=True),
-
-        sa.Column("code", sa.String(length=30), nullable=False),
-
-        sa.Column(
-            "customer_id",
-            sa.Integer(),
-            sa.ForeignKey("customers.id", ondelete="CASCADE"),
-            nullable=False,
-        ),
-        sa.Column(
-            "subscription_id",
-            sa.Integer(),
-            sa.ForeignKey("subscriptions.id", ondelete="SET NULL"),
-            nullable=True,
-        ),
-        sa.Column(
-            "location_id",
-            sa.Integer(),
-            sa.ForeignKey("customer_locations.id", ondelete="SET NULL"),
-            nullable=True,
-        ),
-
-        sa.Column("category", sa.String(length=40), nullable=False, server_default=sa.text("'outage'")),
-        sa.Column("priority", sa.String(length=10), nullable=False, server_default=sa.text("'med'")),
-        sa.Column("status", sa.String(length=20), nullable=False, server_default=sa.text("'open'")),
-
-        sa.Column("subject", sa.String(length=160), nullable=False),
-        sa.Column("description", sa.Text(), nullable=True),
-
-        sa.Column(
-            "opened_at_utc",
-            sa.DateTime(),
-            nullable=False,
-            server_default=sa.text("timezone('utc', now())"),
-        ),
-        sa.Column("resolved_at_utc", sa.DateTime(), nullable=True),
-        sa.Column("closed_at_utc", sa.DateTime(), nullable=True),
-
-        sa.Column(
-            "created_by_admin_id",
-            sa.Integer(),
-            sa.ForeignKey("admin_users.id", ondelete="RESTRICT"),
-            nullable=False,
-        ),
-        sa.Column(
-            "assigned_to_admin_id",
-            sa.Integer(),
-            sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
-            nullable=True,
-        ),
-
-        sa.Column(
-            "created_at",
-            sa.DateTime(),
-            nullable=False,
-            server_default=sa.text("timezone('utc', now())"),
-        ),
-        sa.Column(
-            "updated_at",
-            sa.DateTime(),
-            nullable=False,
-            server_default=sa.text("timezone('utc', now())"),
-        ),
+    if "tickets" not in existing_tables:
+        op.create_table(
+            "tickets",
+            sa.Column("id", sa.Integer(), primary_key=True),
+
+            sa.Column("code", sa.String(length=30), nullable=False),
+
+            sa.Column(
+                "customer_id",
+                sa.Integer(),
+                sa.ForeignKey("customers.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column(
+                "subscription_id",
+                sa.Integer(),
+                sa.ForeignKey("subscriptions.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+            sa.Column(
+                "location_id",
+                sa.Integer(),
+                sa.ForeignKey("customer_locations.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+
+            sa.Column("category", sa.String(length=40), nullable=False, server_default=sa.text("'outage'")),
+            sa.Column("priority", sa.String(length=10), nullable=False, server_default=sa.text("'med'")),
+            sa.Column("status", sa.String(length=20), nullable=False, server_default=sa.text("'open'")),
+
+            sa.Column("subject", sa.String(length=160), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+
+            sa.Column(
+                "opened_at_utc",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("timezone('utc', now())"),
+            ),
+            sa.Column("resolved_at_utc", sa.DateTime(), nullable=True),
+            sa.Column("closed_at_utc", sa.DateTime(), nullable=True),
+
+            sa.Column(
+                "created_by_admin_id",
+                sa.Integer(),
+                sa.ForeignKey("admin_users.id", ondelete="RESTRICT"),
+                nullable=False,
+            ),
+            sa.Column(
+                "assigned_to_admin_id",
+                sa.Integer(),
+                sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+
+            sa.Column(
+                "created_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("timezone('utc', now())"),
+            ),
+            sa.Column(
+                "updated_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("timezone('utc', now())"),
+            ),
+        )
+
+        op.create_unique_constraint("uq_tickets_code", "tickets", ["code"])
+
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_tickets_customer_id ON tickets (customer_id);
+        CREATE INDEX IF NOT EXISTS ix_tickets_subscription_id ON tickets (subscription_id);
+        CREATE INDEX IF NOT EXISTS ix_tickets_location_id ON tickets (location_id);
+        CREATE INDEX IF NOT EXISTS ix_tickets_status ON tickets (status);
+        CREATE INDEX IF NOT EXISTS ix_tickets_priority ON tickets (priority);
+        CREATE INDEX IF NOT EXISTS ix_tickets_category ON tickets (category);
+        CREATE INDEX IF NOT EXISTS ix_tickets_created_by_admin_id ON tickets (created_by_admin_id);
+        CREATE INDEX IF NOT EXISTS ix_tickets_assigned_to_admin_id ON tickets (assigned_to_admin_id);
+        CREATE INDEX IF NOT EXISTS ix_tickets_opened_at_utc ON tickets (opened_at_utc);
+        CREATE INDEX IF NOT EXISTS ix_tickets_resolved_at_utc ON tickets (resolved_at_utc);
+        """
     )
 
-    op.create_unique_constraint("uq_tickets_code", "tickets", ["code"])
-    op.create_index("ix_tickets_customer_id", "tickets", ["customer_id"])
-    op.create_index("ix_tickets_subscription_id", "tickets", ["subscription_id"])
-    op.create_index("ix_tickets_location_id", "tickets", ["location_id"])
-    op.create_index("ix_tickets_status", "tickets", ["status"])
-    op.create_index("ix_tickets_priority", "tickets", ["priority"])
-    op.create_index("ix_tickets_category", "tickets", ["category"])
-    op.create_index("ix_tickets_created_by_admin_id", "tickets", ["created_by_admin_id"])
-    op.create_index("ix_tickets_assigned_to_admin_id", "tickets", ["assigned_to_admin_id"])
-    op.create_index("ix_tickets_opened_at_utc", "tickets", ["opened_at_utc"])
-    op.create_index("ix_tickets_resolved_at_utc", "tickets", ["resolved_at_utc"])
-
     # ---------------------------------------------------------
     # ticket_updates
     # ---------------------------------------------------------
-    op.create_table(
-        "ticket_updates",
-        sa.Column("id", sa.Integer(), primary_key=True),
-
-        sa.Column(
-            "ticket_id",
-            sa.Integer(),
-            sa.ForeignKey("tickets.id", ondelete="CASCADE"),
-            nullable=False,
-        ),
-
-        sa.Column(
-            "actor_admin_id",
-            sa.Integer(),
-            sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
-            nullable=True,
-        ),
-
-        sa.Column("message", sa.Text(), nullable=True),
-
-        sa.Column("status_from", sa.String(length=20), nullable=True),
-        sa.Column("status_to", sa.String(length=20), nullable=True),
-
-        sa.Column(
-            "assigned_from_admin_id",
-            sa.Integer(),
-            sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
-            nullable=True,
-        ),
-        sa.Column(
-            "assigned_to_admin_id",
-            sa.Integer(),
-            sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
-            nullable=True,
-        ),
-
-        sa.Column(
-            "created_at",
-            sa.DateTime(),
-            nullable=False,
-            server_default=sa.text("timezone('utc', now())"),
-        ),
+    if "ticket_updates" not in existing_tables:
+        op.create_table(
+            "ticket_updates",
+            sa.Column("id", sa.Integer(), primary_key=True),
+
+            sa.Column(
+                "ticket_id",
+                sa.Integer(),
+                sa.ForeignKey("tickets.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+
+            sa.Column(
+                "actor_admin_id",
+                sa.Integer(),
+                sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+
+            sa.Column("message", sa.Text(), nullable=True),
+
+            sa.Column("status_from", sa.String(length=20), nullable=True),
+            sa.Column("status_to", sa.String(length=20), nullable=True),
+
+            sa.Column(
+                "assigned_from_admin_id",
+                sa.Integer(),
+                sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+            sa.Column(
+                "assigned_to_admin_id",
+                sa.Integer(),
+                sa.ForeignKey("admin_users.id", ondelete="SET NULL"),
+                nullable=True,
+            ),
+
+            sa.Column(
+                "created_at",
+                sa.DateTime(),
+                nullable=False,
+                server_default=sa.text("timezone('utc', now())"),
+            ),
+        )
+
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_ticket_updates_ticket_id ON ticket_updates (ticket_id);
+        CREATE INDEX IF NOT EXISTS ix_ticket_updates_actor_admin_id ON ticket_updates (actor_admin_id);
+        CREATE INDEX IF NOT EXISTS ix_ticket_updates_created_at ON ticket_updates (created_at);
+        CREATE INDEX IF NOT EXISTS ix_ticket_updates_status_to ON ticket_updates (status_to);
+        CREATE INDEX IF NOT EXISTS ix_ticket_updates_assigned_to_admin_id ON ticket_updates (assigned_to_admin_id);
+        """
     )
 
-    op.create_index("ix_ticket_updates_ticket_id", "ticket_updates", ["ticket_id"])
-    op.create_index("ix_ticket_updates_actor_admin_id", "ticket_updates", ["actor_admin_id"])
-    op.create_index("ix_ticket_updates_created_at", "ticket_updates", ["created_at"])
-    op.create_index("ix_ticket_updates_status_to", "ticket_updates", ["status_to"])
-    op.create_index("ix_ticket_updates_assigned_to_admin_id", "ticket_updates", ["assigned_to_admin_id"])
-
 
 def downgrade() -> None:
+    # One DROP INDEX per table (Postgres accepts a list of names).
+
     # ticket_updates
-    op.drop_index("ix_ticket_updates_assigned_to_admin_id", table_name="ticket_updates")
-    op.drop_index("ix_ticket_updates_status_to", table_name="ticket_updates")
-    op.drop_index("ix_ticket_updates_created_at", table_name="ticket_updates")
-    op.drop_index("ix_ticket_updates_actor_admin_id", table_name="ticket_updates")
-    op.drop_index("ix_ticket_updates_ticket_id", table_name="ticket_updates")
-    op.drop_table("ticket_updates")
+    op.execute(
+        """
+        DROP INDEX IF EXISTS
+            ix_ticket_updates_assigned_to_admin_id,
+            ix_ticket_updates_status_to,
+            ix_ticket_updates_created_at,
+            ix_ticket_updates_actor_admin_id,
+            ix_ticket_updates_ticket_id;
+        """
+    )
+    op.execute("DROP TABLE IF EXISTS ticket_updates;")
 
     # tickets
-    op.drop_index("ix_tickets_resolved_at_utc", table_name="tickets")
-    op.drop_index("ix_tickets_opened_at_utc", table_name="tickets")
-    op.drop_index("ix_tickets_assigned_to_admin_id", table_name="tickets")
-    op.drop_index("ix_tickets_created_by_admin_id", table_name="tickets")
-    op.drop_index("ix_tickets_category", table_name="tickets")
-    op.drop_index("ix_tickets_priority", table_name="tickets")
-    op.drop_index("ix_tickets_status", table_name="tickets")
-    op.drop_index("ix_tickets_location_id", table_name="tickets")
-    op.drop_index("ix_tickets_subscription_id", table_name="tickets")
-    op.drop_index("ix_tickets_customer_id", table_name="tickets")
-    op.drop_constraint("uq_tickets_code", "tickets", type_="unique")
-    op.drop_table("tickets")
+    op.execute(
+        """
+        DROP INDEX IF EXISTS
+            ix_tickets_resolved_at_utc,
+            ix_tickets_opened_at_utc,
+            ix_tickets_assigned_to_admin_id,
+            ix_tickets_created_by_admin_id,
+            ix_tickets_category,
+            ix_tickets_priority,
+            ix_tickets_status,
+            ix_tickets_location_id,
+            ix_tickets_subscription_id,
+            ix_tickets_customer_id;
+        """
+    )
+    # uq_tickets_code goes with the table
+    op.execute("DROP TABLE IF EXISTS tickets;")
 
     # customer_locations
-    op.drop_index("uq_customer_one_active_location", table_name="customer_locations")
-    op.drop_index("ix_customer_locations_created_by_admin_id", table_name="customer_locations")
-    op.drop_index("ix_customer_locations_active_to_utc", table_name="customer_locations")
-    op.drop_index("ix_customer_locations_active_from_utc", table_name="customer_locations")
-    op.drop_index("ix_customer_locations_active", table_name="customer_locations")
-    op.drop_index("ix_customer_locations_customer_id", table_name="customer_locations")
-    op.drop_table("customer_locations")
\ No newline at end of file
+    op.execute(
+        """
+        DROP INDEX IF EXISTS
+            uq_customer_one_active_location,
+            ix_customer_locations_created_by_admin_id,
+            ix_customer_locations_active_to_utc,
+            ix_customer_locations_active_from_utc,
+            ix_customer_locations_active,
+            ix_customer_locations_customer_id;
+        """
+    )
+    op.execute("DROP TABLE IF EXISTS customer_locations;")
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""subscriptions pending_package_id foreign key
+
+Revision ID: 9b4d7e21c5a8
+Revises: 6a3f0c8e2d17
+Create Date: 2026-10-16 14:03:47.915260
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4d7e21c5a8'
+down_revision = '6a3f0c8e2d17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NOT VALID: new writes are checked immediately but existing rows are not
+    # scanned, so the ALTER only holds its lock for a moment.
+    # DROP IF EXISTS first: databases sitting at f6e7d73af2c9 from before the
+    # split already have this FK (without the delete action).
+    # ON DELETE SET NULL: if a queued package is deleted the subscription just
+    # has no pending change; the pending_package_id index serves the lookup.
+    #
+    # Fail-fast DDL timeouts, reset at the end; see migrations/README.
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+    op.execute(
+        """
+        ALTER TABLE subscriptions
+        DROP CONSTRAINT IF EXISTS fk_subscriptions_pending_package_id_packages,
+        ADD CONSTRAINT fk_subscriptions_pending_package_id_packages
+        FOREIGN KEY (pending_package_id) REFERENCES packages (id)
+        ON DELETE SET NULL
+        NOT VALID;
+        """
+    )
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
+
+    # VALIDATE in its own transaction: it scans existing rows under
+    # SHARE UPDATE EXCLUSIVE, which doesn't block reads or writes, so it
+    # needs no statement_timeout.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "ALTER TABLE subscriptions "
+            "VALIDATE CONSTRAINT fk_subscriptions_pending_package_id_packages;"
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+
+    # IF EXISTS: c7cdfc77cfd2's downgrade may already have removed it.
+    op.execute(
+        "ALTER TABLE subscriptions "
+        "DROP CONSTRAINT IF EXISTS fk_subscriptions_pending_package_id_packages;"
+    )
+
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
@@ -16,20 +16,27 @@ depends_on = None
 
 def upgrade():
     # =========================================================
-    # 1) packages.created_at (SAFE ADD: nullable -> backfill -> not null)
+    # 1) packages.created_at (single ADD COLUMN ... NOT NULL DEFAULT)
+    #    PG11+ stores the (stable) default in the catalog, so existing rows
+    #    get it without a rewrite, UPDATE backfill or SET NOT NULL rescan.
+    #    The default is dropped again; ccb022ccf02c sets the permanent one.
     # =========================================================
-    with op.batch_alter_table("packages", schema=None) as batch_op:
-        batch_op.add_column(sa.Column("created_at", sa.DateTime(), nullable=True))
-
-    # Backfill existing rows (prevents NOT NULL violation)
-    op.execute("UPDATE packages SET created_at = NOW() WHERE created_at IS NULL")
-
-    with op.batch_alter_table("packages", schema=None) as batch_op:
-        batch_op.alter_column(
+    op.add_column(
+        "packages",
+        sa.Column(
             "created_at",
-            existing_type=sa.DateTime(),
+            sa.DateTime(),
             nullable=False,
-        )
+            server_default=sa.text("timezone('utc', now())"),
+        ),
+    )
+    op.alter_column(
+        "packages",
+        "created_at",
+        existing_type=sa.DateTime(),
+        existing_nullable=False,
+        server_default=None,
+    )
 
     # =========================================================
     # 2) Add helpful indexes (NON-DESTRUCTIVE)
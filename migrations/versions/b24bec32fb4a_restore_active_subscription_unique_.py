@@ -23,27 +23,31 @@ def upgrade() -> None:
       - only one ACTIVE PPPoE entitlement per pppoe_username
     """
 
-    # Hotspot: one ACTIVE per hotspot_username (phone)
-    op.execute(
-        """
-        CREATE UNIQUE INDEX IF NOT EXISTS uq_active_hotspot_username
-        ON subscriptions (hotspot_username)
-        WHERE service_type = 'hotspot'
-          AND status = 'active'
-          AND hotspot_username IS NOT NULL;
-        """
-    )
-
-    # PPPoE: one ACTIVE per pppoe_username (D###/DA####)
-    op.execute(
-        """
-        CREATE UNIQUE INDEX IF NOT EXISTS uq_active_pppoe_username
-        ON subscriptions (pppoe_username)
-        WHERE service_type = 'pppoe'
-          AND status = 'active'
-          AND pppoe_username IS NOT NULL;
-        """
-    )
+    # CONCURRENTLY so the build doesn't block writes on subscriptions.
+    # It can't run inside a transaction, hence the autocommit block.
+    # A failed build leaves an INVALID index; downgrade's DROP cleans it up.
+    with op.get_context().autocommit_block():
+        # Hotspot: one ACTIVE per hotspot_username (phone)
+        op.execute(
+            """
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_active_hotspot_username
+            ON subscriptions (hotspot_username)
+            WHERE service_type = 'hotspot'
+              AND status = 'active'
+              AND hotspot_username IS NOT NULL;
+            """
+        )
+
+        # PPPoE: one ACTIVE per pppoe_username (D###/DA####)
+        op.execute(
+            """
+            CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_active_pppoe_username
+            ON subscriptions (pppoe_username)
+            WHERE service_type = 'pppoe'
+              AND status = 'active'
+              AND pppoe_username IS NOT NULL;
+            """
+        )
 
 
 def downgrade() -> None:
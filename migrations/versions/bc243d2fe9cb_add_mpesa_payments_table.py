@@ -19,8 +19,11 @@ def upgrade():
     bind = op.get_bind()
     insp = sa.inspect(bind)
 
+    # Reflect once; reused for the guard and the FK checks below
+    public_tables = set(insp.get_table_names(schema="public"))
+
     # Idempotent guard (helps if table already exists in some env)
-    if "mpesa_payments" in insp.get_table_names(schema="public"):
+    if "mpesa_payments" in public_tables:
         return
 
     op.create_table(
@@ -54,7 +57,6 @@ def upgrade():
     )
 
     # Add FKs only if referenced tables exist (prevents deploy-time failure)
-    public_tables = set(insp.get_table_names(schema="public"))
     if "customers" in public_tables:
         op.create_foreign_key(
             "fk_mpesa_payments_customer",
@@ -1,7 +1,7 @@
 """add pending_package_id to subscriptions
 
 Revision ID: c7cdfc77cfd2
-Revises: f6e7d73af2c9
+Revises: 9b4d7e21c5a8
 Create Date: 2026-02-06 01:00:20.249886
 """
 
@@ -12,7 +12,7 @@ from sqlalchemy import inspect
 
 # revision identifiers, used by Alembic.
 revision = "c7cdfc77cfd2"
-down_revision = "f6e7d73af2c9"
+down_revision = "9b4d7e21c5a8"
 branch_labels = None
 depends_on = None
 
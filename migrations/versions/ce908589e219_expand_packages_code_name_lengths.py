@@ -15,6 +15,26 @@ branch_labels = None
 depends_on = None
 
 
+def _resize_varchar(table: str, column: str, old_len: int, new_len: int) -> None:
+    """Change a NOT NULL varchar column's length.
+
+    Postgres/MySQL do this in place with ALTER COLUMN TYPE (catalog-only
+    when widening on Postgres). Other backends (SQLite) can't alter a
+    column type, so fall back to Alembic's batch mode, which builds the
+    new table, copies rows, swaps it in and recreates indexes.
+    """
+    kwargs = dict(
+        existing_type=sa.VARCHAR(length=old_len),
+        type_=sa.String(length=new_len),
+        existing_nullable=False,
+    )
+    if op.get_bind().dialect.name in ("postgresql", "mysql"):
+        op.alter_column(table, column, **kwargs)
+    else:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column, **kwargs)
+
+
 def upgrade() -> None:
     """
     Only expand:
@@ -23,19 +43,16 @@ def upgrade() -> None:
 
     Keep this migration surgical. No unrelated schema edits.
     """
-    with op.batch_alter_table("packages", schema=None) as batch_op:
-        batch_op.alter_column(
-            "code",
-            existing_type=sa.VARCHAR(length=20),
-            type_=sa.String(length=30),
-            existing_nullable=False,
-        )
-        batch_op.alter_column(
-            "name",
-            existing_type=sa.VARCHAR(length=60),
-            type_=sa.String(length=80),
-            existing_nullable=False,
-        )
+    # Fail-fast DDL timeouts, reset at the end; see migrations/README.
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+
+    _resize_varchar("packages", "code", 20, 30)
+    _resize_varchar("packages", "name", 60, 80)
+
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
 
 
 def downgrade() -> None:
@@ -44,16 +61,24 @@ def downgrade() -> None:
       - packages.code: varchar(30) -> varchar(20)
       - packages.name: varchar(80) -> varchar(60)
     """
-    with op.batch_alter_table("packages", schema=None) as batch_op:
-        batch_op.alter_column(
-            "name",
-            existing_type=sa.String(length=80),
-            type_=sa.VARCHAR(length=60),
-            existing_nullable=False,
-        )
-        batch_op.alter_column(
-            "code",
-            existing_type=sa.String(length=30),
-            type_=sa.VARCHAR(length=20),
-            existing_nullable=False,
+    bind = op.get_bind()
+
+    # Narrowing re-checks every row under ACCESS EXCLUSIVE and then errors if
+    # one is too long; find that out first with a cheap probe instead.
+    too_long = bind.execute(
+        sa.text("SELECT 1 FROM packages WHERE length(code) > 20 OR length(name) > 60 LIMIT 1")
+    ).scalar()
+    if too_long:
+        raise RuntimeError(
+            "Cannot downgrade ce908589e219: packages.code > 20 or packages.name > 60 chars; "
+            "shorten those rows first"
         )
+
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+
+    _resize_varchar("packages", "name", 80, 60)
+    _resize_varchar("packages", "code", 30, 20)
+
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
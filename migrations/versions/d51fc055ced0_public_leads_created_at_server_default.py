@@ -17,19 +17,36 @@ depends_on = None
 
 
 def upgrade():
+    # Fail-fast DDL timeouts, reset at the end; see migrations/README.
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+
     op.alter_column(
         "public_leads",
         "created_at",
-        server_default=sa.text("now()"),
+        server_default=sa.func.now(),
         existing_type=sa.DateTime(timezone=True),
         existing_nullable=False,
     )
 
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
+
+
 def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+
     op.alter_column(
         "public_leads",
         "created_at",
         server_default=None,
+        existing_server_default=sa.func.now(),
         existing_type=sa.DateTime(timezone=True),
         existing_nullable=False,
-    )
\ No newline at end of file
+    )
+
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
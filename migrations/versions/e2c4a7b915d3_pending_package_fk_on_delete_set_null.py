@@ -0,0 +1,70 @@
+"""subscriptions: pending_package_id FK ON DELETE SET NULL
+
+Revision ID: e2c4a7b915d3
+Revises: 3f8b2d6c41a7
+Create Date: 2026-10-16 15:27:36.204118
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e2c4a7b915d3"
+down_revision = "3f8b2d6c41a7"
+branch_labels = None
+depends_on = None
+
+FK_NAME = "fk_subscriptions_pending_package_id_packages"
+
+
+def _pending_package_fks(bind) -> list[tuple[str, str, bool]]:
+    """(name, confdeltype, convalidated) of every subscriptions.pending_package_id -> packages FK."""
+    rows = bind.execute(
+        sa.text(
+            """
+            SELECT con.conname, con.confdeltype, con.convalidated
+            FROM pg_constraint con
+            JOIN pg_attribute a
+              ON a.attrelid = con.conrelid AND a.attnum = ANY (con.conkey)
+            WHERE con.contype = 'f'
+              AND con.conrelid = 'subscriptions'::regclass
+              AND con.confrelid = 'packages'::regclass
+              AND a.attname = 'pending_package_id'
+            """
+        )
+    )
+    return [tuple(r) for r in rows]
+
+
+def upgrade():
+    # Databases migrated before 9b4d7e21c5a8 declared SET NULL got the FK
+    # with no ON DELETE action, and ones built by db.create_all() carry it
+    # under an autogenerated name. Drop every FK on the column, whatever it
+    # is called, and add back exactly one. Fresh databases already have it.
+    fks = _pending_package_fks(op.get_bind())
+    if fks == [(FK_NAME, "n", True)]:
+        return
+
+    # Swap in one short ALTER (NOT VALID skips the row scan), then VALIDATE
+    # in its own transaction, which doesn't block reads or writes.
+    drops = "".join(f"DROP CONSTRAINT IF EXISTS {name}, " for name, _, _ in fks)
+    op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+    op.execute(
+        f"""
+        ALTER TABLE subscriptions
+            {drops}ADD CONSTRAINT {FK_NAME}
+                FOREIGN KEY (pending_package_id) REFERENCES packages (id)
+                ON DELETE SET NULL
+                NOT VALID;
+        """
+    )
+    op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
+
+    with op.get_context().autocommit_block():
+        op.execute(f"ALTER TABLE subscriptions VALIDATE CONSTRAINT {FK_NAME};")
+
+
+def downgrade():
+    # 9b4d7e21c5a8 creates the FK with SET NULL too, so there is no earlier
+    # state to restore.
+    pass
@@ -15,10 +15,44 @@ down_revision = "ccb022ccf02c"
 branch_labels = None
 depends_on = None
 
+BACKFILL_BATCH_SIZE = 1000
+
 
 def upgrade():
+    bind = op.get_bind()
+
     # 1) Backfill any existing NULLs (safety; should be none if NOT NULL held)
-    op.execute("UPDATE packages SET created_at = timezone('utc', now()) WHERE created_at IS NULL")
+    # In short batches, each committed on its own (autocommit), so a table
+    # with many NULLs never holds row locks for one long transaction.
+    # EXISTS stops at the first NULL, so the normal case (none) costs one
+    # short probe and never enters the autocommit block (which would commit
+    # the migration transaction mid-run).
+    has_nulls = bind.execute(
+        sa.text("SELECT EXISTS (SELECT 1 FROM packages WHERE created_at IS NULL)")
+    ).scalar()
+    if has_nulls:
+        with op.get_context().autocommit_block():
+            while True:
+                res = bind.execute(
+                    sa.text(
+                        """
+                        UPDATE packages
+                        SET created_at = timezone('utc', now())
+                        WHERE id IN (
+                            SELECT id FROM packages
+                            WHERE created_at IS NULL
+                            LIMIT :batch
+                        );
+                        """
+                    ),
+                    {"batch": BACKFILL_BATCH_SIZE},
+                )
+                if res.rowcount == 0:
+                    break
+
+    # Fail-fast DDL timeouts, reset at the end; see migrations/README.
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
 
     # 2) Add a Postgres server default so raw SQL inserts don't fail
     with op.batch_alter_table("packages", schema=None) as batch_op:
@@ -26,16 +60,27 @@ def upgrade():
             "created_at",
             existing_type=sa.DateTime(),
             existing_nullable=False,
-            server_default=sa.text("timezone('utc', now())"),
+            server_default=sa.func.timezone("utc", sa.func.now()),
         )
 
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
+
 
 def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+
     # Remove server default (back to app-side default only)
     with op.batch_alter_table("packages", schema=None) as batch_op:
         batch_op.alter_column(
             "created_at",
             existing_type=sa.DateTime(),
             existing_nullable=False,
+            existing_server_default=sa.func.timezone("utc", sa.func.now()),
             server_default=None,
         )
+
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
@@ -17,18 +17,28 @@ depends_on = None
 
 
 def upgrade():
+    # Column only (nullable, no default: a catalog-only change). The index
+    # and FK follow in their own revisions so each lock is taken and
+    # released on its own instead of all being held until one commit.
+    #
+    # Fail-fast DDL timeouts, reset at the end; see migrations/README.
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+
     op.add_column("subscriptions", sa.Column("pending_package_id", sa.Integer(), nullable=True))
-    op.create_index("ix_subscriptions_pending_package_id", "subscriptions", ["pending_package_id"], unique=False)
-    op.create_foreign_key(
-        "fk_subscriptions_pending_package_id_packages",
-        "subscriptions",
-        "packages",
-        ["pending_package_id"],
-        ["id"],
-    )
+
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
 
 
 def downgrade():
-    op.drop_constraint("fk_subscriptions_pending_package_id_packages", "subscriptions", type_="foreignkey")
-    op.drop_index("ix_subscriptions_pending_package_id", table_name="subscriptions")
-    op.drop_column("subscriptions", "pending_package_id")
\ No newline at end of file
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout = '2s'; SET LOCAL statement_timeout = '30s'")
+
+    # IF EXISTS: c7cdfc77cfd2's downgrade may already have removed it.
+    op.execute("ALTER TABLE subscriptions DROP COLUMN IF EXISTS pending_package_id;")
+
+    if bind.dialect.name == "postgresql":
+        op.execute("SET LOCAL lock_timeout TO DEFAULT; SET LOCAL statement_timeout TO DEFAULT")
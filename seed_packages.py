@@ -1,10 +1,17 @@
-from app import create_app
-from app.extensions import db
-from app.models import Package
+# Core-only: no create_app(), blueprints or model imports just to insert a
+# handful of rows. Needs only DATABASE_URL (from the env, or .env locally).
+import csv
+import io
+import os
+from pathlib import Path
 
-app = create_app()
+import sqlalchemy as sa
+from dotenv import load_dotenv
 
-PACKAGES = [
+if not os.getenv("DATABASE_URL"):
+    load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env", override=False)
+
+_PACKAGES = (
     ("daily_1",   "Daily - 1 User (24 Hours)",   1440,  50,  "1user_daily"),
     ("daily_2",   "Daily - 2 Users (24 Hours)",  1440,  80,  "2users_daily"),
     ("daily_5",   "Daily - 5 Users (24 Hours)",  1440, 150,  "5users_daily"),
@@ -16,7 +23,23 @@ PACKAGES = [
     ("monthly_1", "Monthly - 1 User (30 Days)", 43200, 300,  "1user_monthly"),
     ("monthly_2", "Monthly - 2 Users (30 Days)",43200, 480,  "2users_monthly"),
     ("monthly_5", "Monthly - 5 Users (30 Days)",43200, 900,  "5users_monthly"),
-]
+)
+
+# Insert-ready rows, built once at import. Sorted by code so inserts land in
+# packages_code_key order (rightmost-leaf appends, no scattered page splits).
+# max_devices is explicit: 014c32f037f2 drops its server default, and the
+# model's default=1 only applies to ORM inserts.
+PACKAGE_ROWS = tuple(
+    {
+        "code": code,
+        "name": name,
+        "duration_minutes": mins,
+        "price_kes": price,
+        "max_devices": 1,
+        "mikrotik_profile": profile,
+    }
+    for code, name, mins, price, profile in sorted(_PACKAGES, key=lambda r: r[0])
+)
 
 PPPOE_PACKAGES = [
     ("pppoe_3m",  "PPPoE - 3Mbps (30 Days)",  43200, 1000, "pppoe-3M"),
@@ -27,11 +50,55 @@ PPPOE_PACKAGES = [
 ]
 
 
-with app.app_context():
-    db.create_all()
-    for code, name, mins, price, profile in PACKAGES:
-        exists = Package.query.filter_by(code=code).first()
-        if not exists:
-            db.session.add(Package(code=code, name=name, duration_minutes=mins, price_kes=price, mikrotik_profile=profile))
-    db.session.commit()
-    print("Seeded packages ✅")
+SEED_COLUMNS = ("code", "name", "duration_minutes", "price_kes", "max_devices", "mikrotik_profile")
+
+
+def bulk_seed(conn, rows) -> None:
+    """COPY rows into a temp table, then add the ones whose code is new.
+
+    COPY skips per-row parse/plan, so this scales with the size of the seed
+    list; the INSERT ... SELECT keeps the ON CONFLICT (code) DO NOTHING
+    semantics. Needs psycopg2 (copy_expert).
+    """
+    cols = ", ".join(SEED_COLUMNS)
+
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow([row[c] for c in SEED_COLUMNS])
+    buf.seek(0)
+
+    conn.exec_driver_sql(
+        "CREATE TEMP TABLE _seed_packages ("
+        "code text, name text, duration_minutes integer, price_kes integer, "
+        "max_devices integer, mikrotik_profile text"
+        ") ON COMMIT DROP"
+    )
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY _seed_packages ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+    finally:
+        cursor.close()
+
+    conn.exec_driver_sql(
+        f"INSERT INTO packages ({cols}) "
+        f"SELECT {cols} FROM _seed_packages ORDER BY code "
+        "ON CONFLICT (code) DO NOTHING"
+    )
+
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+if not DATABASE_URL:
+    raise SystemExit("DATABASE_URL is not set")
+
+engine = sa.create_engine(DATABASE_URL)
+
+# Schema is owned by Alembic; just make sure the migrations have run.
+if not sa.inspect(engine).has_table("packages"):
+    raise SystemExit("packages table missing: run `flask db upgrade` first")
+
+# Codes that already exist are skipped; created_at comes from its server
+# default.
+with engine.begin() as conn:
+    bulk_seed(conn, PACKAGE_ROWS)
+print("Seeded packages ✅")